@@ -17,7 +17,9 @@
 
 # Automated backup system with rotation
 # - Backs up ~/projects/data/ for all users (if exists)
-# - Creates tar.gz compressed archives
+# - Creates tar.gz compressed archives, or with BACKUP_MODE=dedup, snapshots in
+#   a deduplicating chunk store (chunk-store.py): only changed chunks are
+#   written and every retention point is a small manifest
 # - Retention: 7 daily, 4 weekly (Sat), 6 monthly (1st Sat)
 # - Logs to $BACKUPROOT/{username}/backup.log
 
@@ -43,6 +45,36 @@ RETENTION_DAILY=3
 RETENTION_WEEKLY=1
 RETENTION_MONTHLY=1
 
+# Backup mode (set BACKUP_MODE in /etc/profile.d/backups.sh):
+#   tar   - full tar.gz per daily, staged on NVMe, weekly/monthly hardlinked
+#   dedup - chunk-store.py snapshot under $BACKUP_DIR/store; only chunks not
+#           already stored are compressed (in parallel) and written, then read
+#           back and hash-checked. Weekly/monthly hardlink the daily manifest;
+#           rotation deletes manifests and `gc` drops unreferenced chunks.
+#           Restore: chunk-store.py restore --store <store> <snapshot> <dest>
+BACKUP_MODE="${BACKUP_MODE:-tar}"
+CHUNK_STORE="$(dirname "$(readlink -f "$0")")/chunk-store.py"
+if [ "$BACKUP_MODE" != "tar" ] && [ "$BACKUP_MODE" != "dedup" ]; then
+    echo "ERROR: BACKUP_MODE must be 'tar' or 'dedup' (got '$BACKUP_MODE')"
+    exit 1
+fi
+
+# Exclusions applied to all backups (paths relative to ~/projects):
+# - data/netdata/cache/*.db* : Runtime metadata cache (auto-regenerated, ~656MB)
+# - data/volume-backups/* : Old nested backups (backups inside backups, ~235MB)
+# - data/mongodb/journal/* : MongoDB WAL files (ephemeral, ~315MB)
+# - data/gitlab/logs/*.log : GitLab logs (growing continuously, ~100MB+)
+EXCLUDES=(
+    'data/netdata/cache/*.db*'
+    'data/volume-backups/*'
+    'data/mongodb/journal/*'
+    'data/gitlab/logs/*.log'
+)
+EXCLUDE_ARGS=()
+for PATTERN in "${EXCLUDES[@]}"; do
+    EXCLUDE_ARGS+=("--exclude=$PATTERN")
+done
+
 # Date calculations
 TODAY=$(date +%Y-%m-%d)
 DAY_OF_WEEK=$(date +%u)  # 1=Monday, 6=Saturday, 7=Sunday
@@ -74,6 +106,7 @@ echo -e "${BLUE}=== Automated Backup System ===${NC}"
 echo "Date: $TODAY"
 echo "Day of week: $DAY_OF_WEEK (Saturday=$IS_SATURDAY)"
 echo "First Saturday: $IS_FIRST_SATURDAY"
+echo "Mode: $BACKUP_MODE"
 echo "Backup types: Daily$([ "$IS_SATURDAY" = true ] && echo ", Weekly")$([ "$IS_FIRST_SATURDAY" = true ] && echo ", Monthly")"
 echo ""
 
@@ -115,6 +148,16 @@ for USERNAME in "${USERS[@]}"; do
     LOG_FILE="$USER_BACKUP_ROOT/backup.log"
     USER_GROUP=$(id -gn "$USERNAME" 2>/dev/null || echo "$USERNAME")
 
+    # Retention points: tar archives, or snapshot manifests in the chunk store
+    if [ "$BACKUP_MODE" = "dedup" ]; then
+        STORE_DIR="$BACKUP_DIR/store"
+        POINT_DIR="$STORE_DIR/snapshots"
+        POINT_EXT="json.gz"
+    else
+        POINT_DIR="$BACKUP_DIR"
+        POINT_EXT="tar.gz"
+    fi
+
     # Check if source directory exists
     if [ ! -d "$SOURCE_DIR" ]; then
         echo -e "${YELLOW}  ⊘ Skipping: $SOURCE_DIR does not exist${NC}"
@@ -148,17 +191,34 @@ for USERNAME in "${USERS[@]}"; do
     # Create backups based on schedule
     BACKUPS_CREATED=0
 
-    # Exclusions applied to all backups:
-    # - data/netdata/cache/*.db* : Runtime metadata cache (auto-regenerated, ~656MB)
-    # - data/volume-backups/* : Old nested backups (backups inside backups, ~235MB)
-    # - data/mongodb/journal/* : MongoDB WAL files (ephemeral, ~315MB)
-    # - data/gitlab/logs/*.log : GitLab logs (growing continuously, ~100MB+)
-
     # 1. DAILY BACKUP (always) — stage to NVMe, verify locally, copy to USB
-    DAILY_FILE="$BACKUP_DIR/${PROJECT_NAME}-daily-${TODAY}.tar.gz"
+    #    (dedup mode: write new chunks straight to the store, read them back)
+    DAILY_FILE="$POINT_DIR/${PROJECT_NAME}-daily-${TODAY}.$POINT_EXT"
     LOCAL_DIR="/var/tmp/backup-staging/$USERNAME/projects/$PROJECT_NAME"
     LOCAL_FILE="$LOCAL_DIR/${PROJECT_NAME}-daily.tar.gz"
-    if [ ! -f "$DAILY_FILE" ]; then
+    if [ ! -f "$DAILY_FILE" ] && [ "$BACKUP_MODE" = "dedup" ]; then
+        echo -e "${GREEN}  → Creating daily snapshot (changed chunks only → verify)...${NC}"
+        # Like tar, live files may change underneath; the manifest is only
+        # written once every new chunk has been read back and hash-checked.
+        # Exit 3: snapshot written, but files that could not be read were left out.
+        SNAP_RC=0
+        python3 "$CHUNK_STORE" backup --store "$STORE_DIR" --name "${PROJECT_NAME}-daily-${TODAY}" \
+            --chown "$USERNAME:$USER_GROUP" -C "$USER_HOME/projects" "${EXCLUDE_ARGS[@]}" \
+            "$PROJECT_NAME" 2>&1 | tee -a "$LOG_FILE" || SNAP_RC=${PIPESTATUS[0]}
+        if [ "$SNAP_RC" -eq 0 ] || [ "$SNAP_RC" -eq 3 ]; then
+            echo "$(date '+%Y-%m-%d %H:%M:%S') - DAILY - Snapshot: $(basename "$DAILY_FILE")" >> "$LOG_FILE"
+            if [ "$SNAP_RC" -eq 3 ]; then
+                echo "$(date '+%Y-%m-%d %H:%M:%S') - ERROR - Daily snapshot incomplete: unreadable files left out (see warnings above)" >> "$LOG_FILE"
+                echo -e "${RED}    ✗ Daily snapshot written but incomplete (unreadable files left out)${NC}"
+            else
+                echo -e "${GREEN}    ✓ Daily snapshot written and verified${NC}"
+            fi
+            BACKUPS_CREATED=$((BACKUPS_CREATED + 1))
+        else
+            echo "$(date '+%Y-%m-%d %H:%M:%S') - ERROR - Daily snapshot failed; no manifest written (orphan chunks are dropped by gc)" >> "$LOG_FILE"
+            echo -e "${RED}    ✗ Daily snapshot failed; no manifest written${NC}"
+        fi
+    elif [ ! -f "$DAILY_FILE" ]; then
         echo -e "${GREEN}  → Creating daily backup (NVMe stage → verify → copy to USB)...${NC}"
 
         # Ensure local staging dir exists; wipe any prior local copy + stale quarantines
@@ -170,10 +230,7 @@ for USERNAME in "${USERS[@]}"; do
         # live snapshot (postgres WAL, loki chunks, mongo diagnostic). Don't trust its
         # exit code — validate the archive structurally afterwards instead.
         tar -czf "$LOCAL_FILE" -C "$USER_HOME/projects" \
-            --exclude='data/netdata/cache/*.db*' \
-            --exclude='data/volume-backups/*' \
-            --exclude='data/mongodb/journal/*' \
-            --exclude='data/gitlab/logs/*.log' \
+            "${EXCLUDE_ARGS[@]}" \
             "$PROJECT_NAME" 2>&1 | tee -a "$LOG_FILE" || true
 
         if [ -s "$LOCAL_FILE" ] \
@@ -212,7 +269,7 @@ for USERNAME in "${USERS[@]}"; do
     # alive until weekly rotation drops it. Requires daily and weekly to live
     # on the same filesystem (both are under $BACKUP_DIR on /mnt/backup).
     if [ "$IS_SATURDAY" = true ]; then
-        WEEKLY_FILE="$BACKUP_DIR/${PROJECT_NAME}-weekly-${TODAY}.tar.gz"
+        WEEKLY_FILE="$POINT_DIR/${PROJECT_NAME}-weekly-${TODAY}.$POINT_EXT"
         if [ ! -f "$WEEKLY_FILE" ]; then
             if [ -f "$DAILY_FILE" ]; then
                 echo -e "${GREEN}  → Promoting today's daily to weekly (hardlink)...${NC}"
@@ -239,7 +296,7 @@ for USERNAME in "${USERS[@]}"; do
     # Same rationale as weekly: zero extra bytes; data persists across daily
     # rotation via the surviving link.
     if [ "$IS_FIRST_SATURDAY" = true ]; then
-        MONTHLY_FILE="$BACKUP_DIR/${PROJECT_NAME}-monthly-${TODAY}.tar.gz"
+        MONTHLY_FILE="$POINT_DIR/${PROJECT_NAME}-monthly-${TODAY}.$POINT_EXT"
         if [ ! -f "$MONTHLY_FILE" ]; then
             if [ -f "$DAILY_FILE" ]; then
                 echo -e "${GREEN}  → Promoting today's daily to monthly (hardlink)...${NC}"
@@ -267,11 +324,11 @@ for USERNAME in "${USERS[@]}"; do
     BACKUPS_DELETED=0
 
     # Rotate daily backups (keep last 7)
-    DAILY_COUNT=$(ls -1 "$BACKUP_DIR/${PROJECT_NAME}-daily-"*.tar.gz 2>/dev/null | wc -l)
+    DAILY_COUNT=$( (ls -1 "$POINT_DIR/${PROJECT_NAME}-daily-"*."$POINT_EXT" 2>/dev/null || true) | wc -l)
     if [ "$DAILY_COUNT" -gt "$RETENTION_DAILY" ]; then
         DELETE_COUNT=$((DAILY_COUNT - RETENTION_DAILY))
         echo "    Daily: $DAILY_COUNT found, deleting oldest $DELETE_COUNT"
-        ls -1t "$BACKUP_DIR/${PROJECT_NAME}-daily-"*.tar.gz | tail -n "$DELETE_COUNT" | while read -r old_file; do
+        ls -1t "$POINT_DIR/${PROJECT_NAME}-daily-"*."$POINT_EXT" | tail -n "$DELETE_COUNT" | while read -r old_file; do
             echo "$(date '+%Y-%m-%d %H:%M:%S') - DELETE - Daily: $(basename "$old_file")" >> "$LOG_FILE"
             rm -f "$old_file"
             BACKUPS_DELETED=$((BACKUPS_DELETED + 1))
@@ -282,11 +339,11 @@ for USERNAME in "${USERS[@]}"; do
     fi
 
     # Rotate weekly backups (keep last 4)
-    WEEKLY_COUNT=$(ls -1 "$BACKUP_DIR/${PROJECT_NAME}-weekly-"*.tar.gz 2>/dev/null | wc -l)
+    WEEKLY_COUNT=$( (ls -1 "$POINT_DIR/${PROJECT_NAME}-weekly-"*."$POINT_EXT" 2>/dev/null || true) | wc -l)
     if [ "$WEEKLY_COUNT" -gt "$RETENTION_WEEKLY" ]; then
         DELETE_COUNT=$((WEEKLY_COUNT - RETENTION_WEEKLY))
         echo "    Weekly: $WEEKLY_COUNT found, deleting oldest $DELETE_COUNT"
-        ls -1t "$BACKUP_DIR/${PROJECT_NAME}-weekly-"*.tar.gz | tail -n "$DELETE_COUNT" | while read -r old_file; do
+        ls -1t "$POINT_DIR/${PROJECT_NAME}-weekly-"*."$POINT_EXT" | tail -n "$DELETE_COUNT" | while read -r old_file; do
             echo "$(date '+%Y-%m-%d %H:%M:%S') - DELETE - Weekly: $(basename "$old_file")" >> "$LOG_FILE"
             rm -f "$old_file"
             BACKUPS_DELETED=$((BACKUPS_DELETED + 1))
@@ -297,11 +354,11 @@ for USERNAME in "${USERS[@]}"; do
     fi
 
     # Rotate monthly backups (keep last 6)
-    MONTHLY_COUNT=$(ls -1 "$BACKUP_DIR/${PROJECT_NAME}-monthly-"*.tar.gz 2>/dev/null | wc -l)
+    MONTHLY_COUNT=$( (ls -1 "$POINT_DIR/${PROJECT_NAME}-monthly-"*."$POINT_EXT" 2>/dev/null || true) | wc -l)
     if [ "$MONTHLY_COUNT" -gt "$RETENTION_MONTHLY" ]; then
         DELETE_COUNT=$((MONTHLY_COUNT - RETENTION_MONTHLY))
         echo "    Monthly: $MONTHLY_COUNT found, deleting oldest $DELETE_COUNT"
-        ls -1t "$BACKUP_DIR/${PROJECT_NAME}-monthly-"*.tar.gz | tail -n "$DELETE_COUNT" | while read -r old_file; do
+        ls -1t "$POINT_DIR/${PROJECT_NAME}-monthly-"*."$POINT_EXT" | tail -n "$DELETE_COUNT" | while read -r old_file; do
             echo "$(date '+%Y-%m-%d %H:%M:%S') - DELETE - Monthly: $(basename "$old_file")" >> "$LOG_FILE"
             rm -f "$old_file"
             BACKUPS_DELETED=$((BACKUPS_DELETED + 1))
@@ -311,8 +368,14 @@ for USERNAME in "${USERS[@]}"; do
         echo "    Monthly: $MONTHLY_COUNT found (keeping all)"
     fi
 
+    # Dedup mode: chunks only the rotated-out manifests referenced go now
+    if [ "$BACKUP_MODE" = "dedup" ] && [ -d "$STORE_DIR" ]; then
+        python3 "$CHUNK_STORE" gc --store "$STORE_DIR" 2>&1 | tee -a "$LOG_FILE" \
+            || echo -e "${YELLOW}    ⚠ Chunk gc failed (non-critical, store keeps extra chunks)${NC}"
+    fi
+
     # Summary
-    TOTAL_BACKUPS=$(ls -1 "$BACKUP_DIR/${PROJECT_NAME}-"*.tar.gz 2>/dev/null | wc -l)
+    TOTAL_BACKUPS=$( (ls -1 "$POINT_DIR/${PROJECT_NAME}-"*."$POINT_EXT" 2>/dev/null || true) | wc -l)
     BACKUP_DIR_SIZE=$(du -sh "$BACKUP_DIR" 2>/dev/null | cut -f1)
 
     echo -e "${GREEN}  ✓ Backup complete for $USERNAME${NC}"
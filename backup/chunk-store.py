@@ -0,0 +1,655 @@
+#!/usr/bin/env python3
+"""chunk-store — deduplicating snapshot store behind backup-projects-data.sh.
+
+Instead of a full `tar -czf` per retention point, every file is cut into
+content-defined chunks, each chunk is stored once under its sha256 (zlib
+compressed, compression spread over a thread pool) and a snapshot is just a
+manifest listing files, metadata and chunk hashes. A daily run only reads
+files whose size/mtime/ctime/inode changed since the last run and only writes
+chunks the store has not seen; weekly/monthly points are hardlinks to a daily
+manifest, so every retention point costs a few MB.
+
+Store layout (one per user/project, e.g. $BACKUPROOT/<user>/projects/data/store):
+  chunks/ab/<sha256>           zlib-compressed chunk, named by the raw bytes' hash
+  snapshots/<name>.json.gz     manifest: header, one JSON line per entry, and a
+                               trailer carrying the sha256 of everything before it
+  index.db                     chunk index (hash -> size) + per-file change cache;
+                               rebuilt from chunks/ if lost
+
+Chunking is a gear hash with one-bit gears: every byte maps to a pseudo-random
+bit and a chunk ends after BOUNDARY_BITS consecutive zero bits (past
+CHUNK_MIN, forced at CHUNK_MAX). A boundary depends only on the bytes just
+before it, so inserts and appends shift chunks instead of rewriting every
+later one, and finding it is bytes.translate + bytes.find — C speed, no deps.
+
+Usage:
+  chunk-store.py backup  --store S --name data-daily-2026-10-19 -C ~/projects data \\
+                         [--exclude 'data/gitlab/logs/*.log' ...] [--chown user:group]
+  chunk-store.py list    --store S
+  chunk-store.py verify  --store S [NAME ...] [--quick]
+  chunk-store.py restore --store S NAME DEST [--path data/postgres]
+  chunk-store.py gc      --store S          # drop chunks no manifest references
+
+Hardlinked files are stored once and re-linked on restore. A file that cannot
+be read during backup is left out of the snapshot, which is then marked
+incomplete and `backup` exits 3 (0 = complete, 1/2 = no snapshot written).
+
+Depends on: Python 3 stdlib only.
+"""
+
+from __future__ import annotations
+
+import argparse
+import collections
+import fnmatch
+import grp
+import gzip
+import hashlib
+import json
+import os
+import pwd
+import sqlite3
+import stat
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+MB = 1 << 20
+CHUNK_MIN = 256 * 1024
+CHUNK_MAX = 8 * MB
+BOUNDARY_BITS = 20                  # ~2 MiB average chunk on random data
+READ_SIZE = 64 * MB
+EXIT_INCOMPLETE = 3                 # snapshot written, but some files could not be read
+# Fixed forever: changing the gear table re-chunks (and re-stores) everything.
+GEAR_BITS = bytes(hashlib.sha256(bytes([b])).digest()[0] & 1 for b in range(256))
+BOUNDARY = b"\0" * BOUNDARY_BITS
+MANIFEST_SUFFIX = ".json.gz"
+
+
+class StoreError(Exception):
+    """A store, manifest or chunk failed an integrity check."""
+
+
+def die(msg: str, code: int = 1) -> "NoReturn":  # type: ignore[name-defined]
+    print(f"chunk-store: {msg}", file=sys.stderr)
+    sys.exit(code)
+
+
+def warn(msg: str) -> None:
+    print(f"chunk-store: warning: {msg}", file=sys.stderr)
+
+
+def human(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+# ── chunking ────────────────────────────────────────────────────────────────
+
+def cut_chunks(fh):
+    """Yield the content-defined chunks of an open binary file, in order.
+
+    Cuts are only decided while at least CHUNK_MAX bytes are buffered (or at
+    EOF), so READ_SIZE block edges never move a boundary.
+    """
+    buf = b""
+    while True:
+        more = fh.read(READ_SIZE)
+        buf = buf + more if buf else more
+        eof = not more
+        bits = buf.translate(GEAR_BITS)
+        view = memoryview(buf)
+        start, n = 0, len(buf)
+        while n - start >= (1 if eof else CHUNK_MAX):
+            lo, hi = start + CHUNK_MIN, min(start + CHUNK_MAX, n)
+            if lo >= n:
+                end = n
+            else:
+                j = bits.find(BOUNDARY, lo - BOUNDARY_BITS, hi)
+                end = hi if j < 0 else j + BOUNDARY_BITS
+            yield view[start:end]
+            start = end
+        if eof:
+            return
+        buf = buf[start:]
+
+
+# ── store ───────────────────────────────────────────────────────────────────
+
+class ChunkStore:
+    """chunks/ + snapshots/ + index.db under one root."""
+
+    def __init__(self, root: str, create: bool = False, owner: tuple | None = None):
+        self.root = os.path.abspath(root)
+        self.chunk_dir = os.path.join(self.root, "chunks")
+        self.snap_dir = os.path.join(self.root, "snapshots")
+        self.owner = owner if owner and os.geteuid() == 0 else None
+        if not os.path.isdir(self.snap_dir):
+            if not create:
+                die(f"no chunk store at {self.root}", 2)
+            for d in (self.root, self.chunk_dir, self.snap_dir):
+                os.makedirs(d, exist_ok=True)
+                self.chown(d)
+        db_path = os.path.join(self.root, "index.db")
+        fresh = not os.path.exists(db_path)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                hash TEXT PRIMARY KEY, size INTEGER, stored INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,
+                ctime_ns INTEGER, inode INTEGER, chunks TEXT);
+        """)
+        self.chown(db_path)
+        if fresh:
+            self.reindex()
+
+    def chown(self, path: str) -> None:
+        if self.owner:
+            os.chown(path, *self.owner)
+
+    def chunk_path(self, h: str) -> str:
+        return os.path.join(self.chunk_dir, h[:2], h)
+
+    def snapshot_path(self, name: str) -> str:
+        return os.path.join(self.snap_dir, name + MANIFEST_SUFFIX)
+
+    def snapshots(self) -> list[str]:
+        return sorted(f[:-len(MANIFEST_SUFFIX)] for f in os.listdir(self.snap_dir)
+                      if f.endswith(MANIFEST_SUFFIX))
+
+    def chunk_files(self):
+        """(hash, path, stored bytes) for every chunk on disk; stray temp files too."""
+        for sub in sorted(os.listdir(self.chunk_dir)):
+            d = os.path.join(self.chunk_dir, sub)
+            if not os.path.isdir(d):
+                continue
+            with os.scandir(d) as it:
+                for e in it:
+                    yield e.name, e.path, e.stat().st_size
+
+    def reindex(self) -> None:
+        """Rebuild the chunk index from chunks/ (raw sizes unknown until rewritten)."""
+        with self.db:
+            self.db.execute("DELETE FROM chunks")
+            self.db.executemany(
+                "INSERT OR REPLACE INTO chunks (hash, size, stored) VALUES (?, NULL, ?)",
+                ((h, n) for h, _, n in self.chunk_files() if ".tmp" not in h))
+
+    def known_chunks(self) -> set[str]:
+        return {h for (h,) in self.db.execute("SELECT hash FROM chunks")}
+
+    def put(self, h: str, data, level: int) -> int:
+        """Compress and write one chunk atomically; return the stored size."""
+        z = zlib.compress(data, level)
+        path = self.chunk_path(h)
+        d = os.path.dirname(path)
+        if not os.path.isdir(d):
+            os.makedirs(d, exist_ok=True)
+            self.chown(d)
+        tmp = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp, "wb") as fh:
+            fh.write(z)
+        self.chown(tmp)
+        os.replace(tmp, path)
+        return len(z)
+
+    def get(self, h: str, size: int | None = None) -> bytes:
+        """Read, decompress and hash-check one chunk."""
+        try:
+            with open(self.chunk_path(h), "rb") as fh:
+                data = zlib.decompress(fh.read())
+        except FileNotFoundError:
+            raise StoreError(f"chunk {h} missing") from None
+        except zlib.error as e:
+            raise StoreError(f"chunk {h} unreadable ({e})") from None
+        if hashlib.sha256(data).hexdigest() != h or (size is not None and len(data) != size):
+            raise StoreError(f"chunk {h} corrupt (content does not match its hash)")
+        return data
+
+
+# ── manifests ───────────────────────────────────────────────────────────────
+
+def write_manifest(store: ChunkStore, name: str, header: dict, entries: list[dict]) -> None:
+    """gzip JSON lines, sealed by a trailer with the sha256 of every line before it."""
+    path = store.snapshot_path(name)
+    tmp = path + ".tmp"
+    digest = hashlib.sha256()
+    total = 0
+    with open(tmp, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+            for obj in [header] + entries:
+                line = (json.dumps(obj, separators=(",", ":")) + "\n").encode()
+                digest.update(line)
+                gz.write(line)
+                total += obj.get("size", 0)
+            trailer = {"end": True, "entries": len(entries), "bytes": total,
+                       "sha256": digest.hexdigest()}
+            gz.write((json.dumps(trailer) + "\n").encode())
+        raw.flush()
+        os.fsync(raw.fileno())
+    store.chown(tmp)
+    os.replace(tmp, path)
+
+
+def read_manifest(store: ChunkStore, name: str) -> tuple[dict, list[dict], dict]:
+    """(header, entries, trailer); StoreError when the manifest fails its seal."""
+    path = store.snapshot_path(name)
+    digest = hashlib.sha256()
+    lines = []
+    try:
+        with gzip.open(path, "rb") as gz:
+            for line in gz:
+                lines.append(line)
+    except FileNotFoundError:
+        raise StoreError(f"no snapshot named {name}") from None
+    except (OSError, EOFError) as e:
+        raise StoreError(f"snapshot {name}: manifest unreadable ({e})") from None
+    if not lines:
+        raise StoreError(f"snapshot {name}: empty manifest")
+    try:
+        trailer = json.loads(lines[-1])
+    except ValueError:
+        trailer = {}
+    for line in lines[:-1]:
+        digest.update(line)
+    if not trailer.get("end") or trailer.get("sha256") != digest.hexdigest():
+        raise StoreError(f"snapshot {name}: manifest truncated or altered")
+    objs = [json.loads(line) for line in lines[:-1]]
+    return objs[0], objs[1:], trailer
+
+
+# ── backup ──────────────────────────────────────────────────────────────────
+
+def walk(base: str, paths: list[str], excludes: list[str]):
+    """(relpath, DirEntry-or-None, stat) depth-first, sorted, excludes pruned.
+
+    Exclude patterns match the path relative to base the way tar --exclude
+    does ('*' crosses '/'); an excluded directory is not descended into.
+    """
+    def excluded(rel):
+        return any(fnmatch.fnmatchcase(rel, p) for p in excludes)
+
+    stack = []
+    for p in reversed(paths):
+        rel = os.path.normpath(p)
+        try:
+            st = os.lstat(os.path.join(base, rel))
+        except OSError as e:
+            die(f"cannot read {os.path.join(base, rel)}: {e.strerror}")
+        stack.append((rel, st))
+    while stack:
+        rel, st = stack.pop()
+        yield rel, st
+        if not stat.S_ISDIR(st.st_mode):
+            continue
+        try:
+            with os.scandir(os.path.join(base, rel)) as it:
+                children = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            warn(f"{rel}: {e.strerror}; directory contents skipped")
+            continue
+        for e in reversed(children):
+            crel = f"{rel}/{e.name}"
+            if excluded(crel):
+                continue
+            try:
+                stack.append((crel, e.stat(follow_symlinks=False)))
+            except OSError:
+                continue
+
+
+def backup(args) -> int:
+    t0 = time.monotonic()
+    owner = parse_owner(args.chown) if args.chown else None
+    store = ChunkStore(args.store, create=True, owner=owner)
+    if os.path.exists(store.snapshot_path(args.name)):
+        die(f"snapshot {args.name} already exists", 2)
+    base = os.path.abspath(args.directory)
+    known = store.known_chunks()
+    cache = {row[0]: row[1:] for row in store.db.execute(
+        "SELECT path, size, mtime_ns, ctime_ns, inode, chunks FROM files")}
+
+    lock = threading.Lock()
+    new_chunks: dict[str, tuple[int, int]] = {}
+
+    def store_chunk(data):
+        h = hashlib.sha256(data).hexdigest()
+        with lock:
+            if h in known:
+                return h, len(data)
+            known.add(h)
+        stored = store.put(h, data, args.level)
+        with lock:
+            new_chunks[h] = (len(data), stored)
+        return h, len(data)
+
+    entries, files = [], []   # files: (relpath, stat key, entry) for the change cache
+    links: dict[tuple[int, int], str] = {}   # (dev, ino) -> first path, for hardlinks
+    linked, unreadable = [], []
+    inflight: collections.deque = collections.deque()
+    read_bytes = changed = unchanged = skipped = 0
+
+    def settle(limit):
+        while len(inflight) > limit:
+            entry, fut = inflight.popleft()
+            h, n = fut.result()
+            entry["chunks"].append(h)
+            entry["size"] += n
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        for rel, st in walk(base, args.paths, args.exclude):
+            entry = {"path": rel, "mode": stat.S_IMODE(st.st_mode), "uid": st.st_uid,
+                     "gid": st.st_gid, "mtime_ns": st.st_mtime_ns}
+            if stat.S_ISDIR(st.st_mode):
+                entries.append({**entry, "type": "dir"})
+                continue
+            if stat.S_ISLNK(st.st_mode):
+                try:
+                    target = os.readlink(os.path.join(base, rel))
+                except OSError:
+                    skipped += 1
+                    continue
+                entries.append({**entry, "type": "symlink", "target": target})
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                skipped += 1          # sockets, fifos, devices: tar would warn too
+                continue
+            if st.st_nlink > 1:
+                first = links.setdefault((st.st_dev, st.st_ino), rel)
+                if first != rel:   # same inode as an earlier path: restore re-links it
+                    entries.append({**entry, "type": "file", "link": first,
+                                    "size": 0, "chunks": []})
+                    linked.append(entries[-1])
+                    continue
+            key = (st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+            hit = cache.get(rel)
+            if hit and tuple(hit[:4]) == key:
+                chunks = json.loads(hit[4])
+                if all(h in known for h in chunks):
+                    entries.append({**entry, "type": "file", "size": hit[0], "chunks": chunks})
+                    files.append((rel, key, entries[-1]))
+                    unchanged += 1
+                    continue
+            entry.update(type="file", size=0, chunks=[])
+            try:
+                with open(os.path.join(base, rel), "rb") as fh:
+                    for data in cut_chunks(fh):
+                        inflight.append((entry, pool.submit(store_chunk, data)))
+                        read_bytes += len(data)
+                        settle(args.jobs * 2)
+            except OSError as e:
+                # vanished or unreadable mid-run: leave it out (and out of the
+                # change cache, so the next run retries) rather than keep a
+                # truncated copy; the snapshot is marked incomplete
+                warn(f"{rel}: {e.strerror}; not in snapshot")
+                unreadable.append(rel)
+                continue
+            entries.append(entry)
+            files.append((rel, key, entry))
+            changed += 1
+        settle(0)
+        by_path = {e["path"]: e for e in entries if "link" not in e}
+        for e in linked:
+            src = by_path.get(e["link"])
+            if src is None:
+                unreadable.append(e["path"])
+                continue
+            e.update(size=src["size"], chunks=list(src["chunks"]))
+        if unreadable:
+            dropped = set(unreadable)
+            entries = [e for e in entries if e["path"] not in dropped]
+
+        os.sync()
+        if args.verify and new_chunks:
+            # re-read what this run wrote before any manifest points at it
+            for fut in [pool.submit(store.get, h, size) for h, (size, _) in new_chunks.items()]:
+                try:
+                    fut.result()
+                except StoreError as e:
+                    die(f"verify after write failed: {e}; no snapshot written")
+
+    header = {"snapshot": args.name, "created": datetime.now(timezone.utc).isoformat(),
+              "base": base, "paths": args.paths, "excludes": args.exclude}
+    if unreadable:
+        header["incomplete"] = sorted(unreadable)
+    write_manifest(store, args.name, header, entries)
+    with store.db:
+        store.db.executemany("INSERT OR REPLACE INTO chunks (hash, size, stored) VALUES (?, ?, ?)",
+                             ((h, s, z) for h, (s, z) in new_chunks.items()))
+        store.db.execute("DELETE FROM files")
+        store.db.executemany("INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                             ((rel, *key, json.dumps(e["chunks"])) for rel, key, e in files))
+
+    total = sum(e.get("size", 0) for e in entries)
+    stored = sum(z for _, z in new_chunks.values())
+    print(f"{args.name}: {len(entries)} entries, {human(total)}; "
+          f"read {human(read_bytes)} from {changed} changed files ({unchanged} unchanged); "
+          f"{len(new_chunks)} new chunks, {human(stored)} written"
+          + (", verified" if args.verify else "")
+          + (f"; {skipped} special files skipped" if skipped else "")
+          + f" in {time.monotonic() - t0:.1f}s")
+    if unreadable:
+        warn(f"snapshot {args.name} is incomplete: {len(unreadable)} unreadable file(s) left out")
+        return EXIT_INCOMPLETE
+    return 0
+
+
+def parse_owner(spec: str) -> tuple[int, int]:
+    user, _, group = spec.partition(":")
+    try:
+        pw = pwd.getpwnam(user)
+        gid = grp.getgrnam(group).gr_gid if group else pw.pw_gid
+    except KeyError:
+        die(f"--chown: unknown user or group '{spec}'", 2)
+    return pw.pw_uid, gid
+
+
+# ── list / verify / restore / gc ────────────────────────────────────────────
+
+def list_snapshots(args) -> int:
+    store = ChunkStore(args.store)
+    for name in store.snapshots():
+        try:
+            header, entries, trailer = read_manifest(store, name)
+        except StoreError as e:
+            print(f"  {name:<32}  ✗ {e}")
+            continue
+        print(f"  {name:<32}  {header['created'][:16].replace('T', ' ')}  "
+              f"{trailer['entries']:>8} entries  {human(trailer['bytes']):>9}"
+              + (f"  (incomplete: {len(header['incomplete'])} missing)"
+                 if header.get("incomplete") else ""))
+    n, stored = store.db.execute("SELECT COUNT(*), COALESCE(SUM(stored), 0) FROM chunks").fetchone()
+    print(f"\n  store: {n} chunks, {human(stored)} on disk")
+    return 0
+
+
+def verify(args) -> int:
+    store = ChunkStore(args.store)
+    names = args.names or store.snapshots()
+    wanted: dict[str, int] = {}
+    bad = []
+    for name in names:
+        try:
+            _, entries, _ = read_manifest(store, name)
+        except StoreError as e:
+            bad.append(str(e))
+            continue
+        for e in entries:
+            for h in e.get("chunks", ()):
+                wanted[h] = 1
+    if args.quick:
+        bad += [f"chunk {h} missing" for h in wanted if not os.path.exists(store.chunk_path(h))]
+    else:
+        def check(h):
+            try:
+                return len(store.get(h)), None
+            except StoreError as e:
+                return 0, str(e)
+
+        total = 0
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            for n, err in pool.map(check, wanted):
+                total += n
+                if err:
+                    bad.append(err)
+    for msg in bad:
+        print(f"  ✗ {msg}")
+    mode = "present" if args.quick else f"read back ({human(total)})"
+    print(f"{len(names)} snapshot(s), {len(wanted)} chunks {mode}: "
+          + (f"{len(bad)} problem(s)" if bad else "ok"))
+    return 1 if bad else 0
+
+
+def safe_join(dest: str, rel: str) -> str:
+    parts = rel.split("/")
+    if rel.startswith("/") or ".." in parts:
+        raise StoreError(f"refusing unsafe manifest path {rel!r}")
+    return os.path.join(dest, *parts)
+
+
+def restore(args) -> int:
+    t0 = time.monotonic()
+    store = ChunkStore(args.store)
+    try:
+        _, entries, _ = read_manifest(store, args.name)
+    except StoreError as e:
+        die(str(e))
+    prefix = os.path.normpath(args.path) if args.path else None
+    if prefix:
+        entries = [e for e in entries
+                   if e["path"] == prefix or e["path"].startswith(prefix + "/")
+                   or prefix.startswith(e["path"] + "/") and e["type"] == "dir"]
+    dest = os.path.abspath(args.dest)
+    as_root = os.geteuid() == 0
+    dirs, files, total = [], 0, 0
+    written_paths = set()   # regular files restored this run, for hardlinks
+
+    def meta(path, e, link=False):
+        if as_root:
+            os.chown(path, e["uid"], e["gid"], follow_symlinks=not link)
+        if not link:
+            os.chmod(path, e["mode"])
+            os.utime(path, ns=(e["mtime_ns"], e["mtime_ns"]))
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+            for e in entries:
+                path = safe_join(dest, e["path"])
+                if e["type"] == "dir":
+                    os.makedirs(path, exist_ok=True)
+                    dirs.append((path, e))
+                    continue
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if os.path.lexists(path) and not os.path.isdir(path):
+                    os.unlink(path)
+                if e["type"] == "symlink":
+                    os.symlink(e["target"], path)
+                    meta(path, e, link=True)
+                    continue
+                if e.get("link") and safe_join(dest, e["link"]) in written_paths:
+                    os.link(safe_join(dest, e["link"]), path)
+                    files += 1
+                    continue
+                written = 0
+                pending: collections.deque = collections.deque()
+                with open(path, "wb") as fh:
+                    for h in e["chunks"]:
+                        pending.append(pool.submit(store.get, h))
+                        if len(pending) > args.jobs * 2:
+                            written += fh.write(pending.popleft().result())
+                    while pending:
+                        written += fh.write(pending.popleft().result())
+                if written != e["size"]:
+                    raise StoreError(f"{e['path']}: restored {written} bytes, manifest says {e['size']}")
+                meta(path, e)
+                written_paths.add(path)
+                files += 1
+                total += written
+    except StoreError as err:
+        die(f"restore failed: {err}")
+    for path, e in reversed(dirs):  # after their contents, so mtimes stick
+        meta(path, e)
+    print(f"{args.name}: restored {files} files ({human(total)}) to {dest}, "
+          f"every chunk hash-checked, in {time.monotonic() - t0:.1f}s")
+    return 0
+
+
+def gc(args) -> int:
+    store = ChunkStore(args.store)
+    referenced = set()
+    for name in store.snapshots():
+        try:
+            _, entries, _ = read_manifest(store, name)
+        except StoreError as e:
+            die(f"{e}; not collecting garbage while a manifest is unreadable")
+        for e in entries:
+            referenced.update(e.get("chunks", ()))
+    dropped, freed = [], 0
+    for h, path, size in list(store.chunk_files()):
+        if h not in referenced:
+            os.unlink(path)
+            dropped.append(h)
+            freed += size
+    with store.db:
+        store.db.executemany("DELETE FROM chunks WHERE hash = ?", ((h,) for h in dropped))
+    print(f"gc: {len(referenced)} chunks referenced, {len(dropped)} removed ({human(freed)} freed)")
+    return 0
+
+
+# ── main ────────────────────────────────────────────────────────────────────
+
+def main() -> int:
+    ap = argparse.ArgumentParser(
+        prog="chunk-store.py",
+        description="Deduplicating snapshot store for project data backups.",
+    )
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    jobs = os.cpu_count() or 4
+
+    def add(name, fn, help_):
+        p = sub.add_parser(name, help=help_)
+        p.add_argument("--store", required=True, help="store directory")
+        p.add_argument("--jobs", "-j", type=int, default=jobs,
+                       help=f"parallel chunk workers (default {jobs})")
+        p.set_defaults(fn=fn)
+        return p
+
+    p = add("backup", backup, "write a snapshot of PATHS (relative to -C)")
+    p.add_argument("--name", required=True, help="snapshot name, e.g. data-daily-2026-10-19")
+    p.add_argument("-C", dest="directory", default=".", help="directory PATHS are relative to")
+    p.add_argument("paths", nargs="+")
+    p.add_argument("--exclude", action="append", default=[],
+                   help="tar-style pattern on the relative path (repeatable)")
+    p.add_argument("--level", type=int, default=6, help="zlib level for new chunks (default 6)")
+    p.add_argument("--chown", help="USER[:GROUP] to own new store files (when run as root)")
+    p.add_argument("--no-verify", dest="verify", action="store_false",
+                   help="skip re-reading new chunks before the manifest is written")
+    add("list", list_snapshots, "list snapshots and store size")
+    p = add("verify", verify, "check manifests and re-hash every chunk they reference")
+    p.add_argument("names", nargs="*", help="snapshots to verify (default all)")
+    p.add_argument("--quick", action="store_true", help="only check that chunks exist")
+    p = add("restore", restore, "restore a snapshot under DEST, verifying every chunk")
+    p.add_argument("name")
+    p.add_argument("dest")
+    p.add_argument("--path", help="restore only this entry (e.g. data/postgres)")
+    add("gc", gc, "delete chunks no snapshot references")
+
+    args = ap.parse_args()
+    args.jobs = max(1, args.jobs)
+    return args.fn(args)
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        sys.exit(0)
+    except KeyboardInterrupt:
+        sys.exit(130)
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Benchmark claude-sessions message counting: per-line json.loads vs mmap markers.
+
+Generates a synthetic Claude transcript (prompts, assistant turns with tool
+calls, tool results of widely varying size and a few progress records that
+embed a nested user message), then counts user+assistant entries both ways:
+
+  json  - decode every line and read "type" (the old get_message_count)
+  mmap  - claude-sessions' byte-marker counter (count_messages)
+
+Usage:
+    bench-message-count.py                   # ~200 MB transcript
+    bench-message-count.py --size 500 --runs 5
+    bench-message-count.py --file ~/.claude/projects/<dir>/<session>.jsonl
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import json
+import mmap
+import os
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MB = 1 << 20
+
+
+def load_claude_sessions():
+    loader = importlib.machinery.SourceFileLoader(
+        "claude_sessions", os.path.join(SCRIPT_DIR, "claude-sessions"))
+    spec = importlib.util.spec_from_loader("claude_sessions", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def generate(path, size_mb):
+    """Write a compact (JSON.stringify-style) transcript of roughly size_mb."""
+    filler = "line of tool output with \"quotes\" and \\backslashes\\ 0123456789\n" * 16
+    dumps = json.JSONEncoder(separators=(",", ":")).encode
+    written, i = 0, 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < size_mb * MB:
+            ts = f"2026-10-{1 + i % 18:02d}T10:{i % 60:02d}:00Z"
+            head = {"parentUuid": f"u{i - 1}", "isSidechain": False, "userType": "external",
+                    "cwd": "/proj", "sessionId": "s", "version": "2.0.0", "gitBranch": "main"}
+            if i % 4 == 0:
+                obj = {**head, "type": "user", "message": {"role": "user", "content": f"please look at issue {i}"}}
+            elif i % 4 == 1:
+                obj = {**head, "type": "assistant", "message": {"role": "assistant", "content": [
+                    {"type": "text", "text": f"Editing module {i % 11}."},
+                    {"type": "tool_use", "name": "Edit", "input": {
+                        "file_path": f"/proj/src/m{i % 11}.py", "old_string": filler[:2000]}}]}}
+            elif i % 4 == 2:
+                # tool output sizes spread log-uniformly between ~1 KB and ~1 MB
+                reps = max(1, int(2 ** (10 + (i * 7919) % 1000 / 100)) // len(filler))
+                obj = {**head, "type": "user", "message": {"role": "user", "content": [
+                    {"type": "tool_result", "tool_use_id": f"t{i}", "content": filler * reps}]}}
+            elif i % 40 == 3:
+                obj = {**head, "type": "progress", "data": {"message": {
+                    "type": "user", "message": {"role": "user", "content": "subagent prompt"}}}}
+            else:
+                obj = {**head, "type": "system", "subtype": "info", "content": "hook ran"}
+            obj["timestamp"] = ts
+            line = dumps(obj) + "\n"
+            fh.write(line)
+            written += len(line)
+            i += 1
+
+
+def count_json(path):
+    count = 0
+    with open(path, "rb") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                continue
+            if isinstance(entry, dict) and entry.get("type") in ("user", "assistant"):
+                count += 1
+    return count
+
+
+def count_mmap(cs, path):
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+        return cs.count_messages(buf)
+
+
+def best_of(runs, fn):
+    best, result = None, None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message counting")
+    parser.add_argument("--size", type=int, default=200, help="Transcript size in MB (default 200)")
+    parser.add_argument("--runs", type=int, default=3, help="Best of N runs per mode (default 3)")
+    parser.add_argument("--file", help="Benchmark an existing transcript instead of generating one")
+    args = parser.parse_args()
+
+    cs = load_claude_sessions()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp, "bench.jsonl")
+            print(f"Generating {args.size} MB transcript...")
+            generate(path, args.size)
+        size_mb = os.path.getsize(path) / MB
+        print(f"Transcript: {size_mb:.0f} MB\n")
+        print(f"{'mode':<6} {'seconds':>8} {'MB/s':>8}  messages")
+        results = {}
+        for mode, fn in (("json", lambda: count_json(path)), ("mmap", lambda: count_mmap(cs, path))):
+            elapsed, count = results[mode] = best_of(args.runs, fn)
+            print(f"{mode:<6} {elapsed:>8.3f} {size_mb / elapsed:>8.0f}  {count:>8}")
+        (tj, cj), (tm, cm) = results["json"], results["mmap"]
+        print(f"\nmmap vs json: {tj / tm:.1f}x faster, counts {'match' if cj == cm else 'DIFFER'}")
+        if cj != cm:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
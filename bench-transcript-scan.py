@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""Benchmark project-status transcript scanning: full json.loads vs streaming.
+
+Generates a synthetic Claude transcript (normal turns plus a few huge
+tool_result / Write payloads), then scans it in a fresh subprocess per mode so
+peak RSS is measured independently:
+
+  full    - read every line whole and json.loads it (the pre-streaming path)
+  stream  - project-status's bounded-memory reader (_iter_records)
+
+Usage:
+    bench-transcript-scan.py                 # ~300 MB transcript, 40 MB max line
+    bench-transcript-scan.py --size 600 --big 80
+    bench-transcript-scan.py --file ~/.claude/projects/<dir>/<session>.jsonl
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MB = 1 << 20
+
+
+def load_project_status():
+    loader = importlib.machinery.SourceFileLoader(
+        "project_status", os.path.join(SCRIPT_DIR, "project-status"))
+    spec = importlib.util.spec_from_loader("project_status", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def generate(path, size_mb, big_mb):
+    """Write a transcript of roughly size_mb with one big_mb line every ~100 MB."""
+    filler = "line of tool output with \"quotes\" and \\backslashes\\ 0123456789\n" * 16
+    written, next_big, i = 0, 50 * MB, 0
+    with open(path, "w", encoding="utf-8") as fh:
+        while written < size_mb * MB:
+            ts = f"2026-10-{1 + i % 18:02d}T10:{i % 60:02d}:00Z"
+            if big_mb and written >= next_big:
+                next_big += 100 * MB
+                payload = filler * (big_mb * MB // len(filler))
+                obj = {"type": "user", "timestamp": ts, "message": {"content": [
+                    {"type": "tool_result", "tool_use_id": f"t{i}", "content": payload}]}}
+            elif i % 3 == 0:
+                obj = {"type": "user", "timestamp": ts, "cwd": "/proj", "gitBranch": "main",
+                       "message": {"content": f"please look at issue {i} in the parser"}}
+            elif i % 3 == 1:
+                obj = {"type": "assistant", "timestamp": ts, "message": {"content": [
+                    {"type": "text", "text": f"Editing module {i % 11}."},
+                    {"type": "tool_use", "name": "Edit", "input": {
+                        "file_path": f"/proj/src/m{i % 11}.py", "old_string": filler[:2000]}}]}}
+            else:
+                # tool output sizes spread log-uniformly between ~1 KB and ~2 MB
+                reps = max(1, int(2 ** (10 + (i * 7919) % 1100 / 100)) // len(filler))
+                obj = {"type": "user", "timestamp": ts, "message": {"content": [
+                    {"type": "tool_result", "tool_use_id": f"t{i}", "content": filler * reps}]}}
+            line = json.dumps(obj) + "\n"
+            fh.write(line)
+            written += len(line)
+            i += 1
+
+
+def peak_rss_mb():
+    """Peak RSS of this process. VmHWM resets on exec; ru_maxrss does not on Linux."""
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def scan(mode, path):
+    """Run one mode in this process; print a JSON result line."""
+    ps = load_project_status()
+    state = ps._new_scan_state()
+    t0 = time.perf_counter()
+    if mode == "full":
+        with open(path, "rb") as fh:
+            for raw in fh:
+                state["offset"] += len(raw)
+                try:
+                    obj = json.loads(raw.decode("utf-8", errors="replace"))
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(obj, dict):
+                    ps._fold(obj, state)
+    else:
+        with open(path, "rb") as fh:
+            ps._scan_records(ps._iter_records(fh), state)
+    elapsed = time.perf_counter() - t0
+    print(json.dumps({
+        "mode": mode,
+        "seconds": elapsed,
+        "mb_per_s": os.path.getsize(path) / MB / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+        "turns": state["turns"],
+        "files": len(state["files"]),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark transcript scanning")
+    parser.add_argument("--size", type=int, default=300, help="Transcript size in MB (default 300)")
+    parser.add_argument("--big", type=int, default=40, help="Size of the huge lines in MB (default 40)")
+    parser.add_argument("--file", help="Benchmark an existing transcript instead of generating one")
+    parser.add_argument("--mode", choices=["full", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        scan(args.mode, args.file)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.file
+        if not path:
+            path = os.path.join(tmp, "bench.jsonl")
+            print(f"Generating {args.size} MB transcript ({args.big} MB max line)...")
+            generate(path, args.size, args.big)
+        print(f"Transcript: {os.path.getsize(path) / MB:.0f} MB\n")
+        print(f"{'mode':<8} {'seconds':>8} {'MB/s':>8} {'peak RSS':>10}  turns  files")
+        results = {}
+        for mode in ("full", "stream"):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--file", path],
+                capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{mode:<8} failed: {proc.stderr.strip().splitlines()[-1:]}")
+                continue
+            r = results[mode] = json.loads(proc.stdout)
+            print(f"{mode:<8} {r['seconds']:>8.2f} {r['mb_per_s']:>8.1f} "
+                  f"{r['peak_rss_mb']:>8.0f}MB  {r['turns']:>5}  {r['files']:>5}")
+        if len(results) == 2:
+            full, stream = results["full"], results["stream"]
+            print(f"\nstream vs full: {full['seconds'] / stream['seconds']:.2f}x throughput, "
+                  f"{full['peak_rss_mb'] / stream['peak_rss_mb']:.1f}x lower peak RSS")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,387 +2,427 @@
 """
 Infrastructure Pattern Detector
 Identifies common patterns across infrastructure and suggests improvements
+
+Usage:
+    detect-patterns.py [project]                 # Report for one project (default: cwd)
+    detect-patterns.py --all --jobs 8            # Score every project, append to history
+    detect-patterns.py --history litellm         # Score history for one project
+    detect-patterns.py --dropped monitoring --below 50 --since 30d
 """
 
+import argparse
 import json
 import re
+import sqlite3
 import subprocess
 import sys
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+PROJECTS_ROOT = Path("/home/administrator/projects")
+SCORE_DB = PROJECTS_ROOT / ".pattern-scores.db"
+SKIP_DIRS = {"admin", "data", "devscripts", "secrets", ".claude"}
+
+# Declarative pattern rules.
+#
+# Each pattern is data: a `when` gate, a max score and an ordered list of checks.
+# A check has a `test` expression, a `score` awarded when the test is truthy, a
+# `found` message (formatted with the test's value) and an optional `missing`
+# message. `scope` skips a check entirely when that input is absent ("docs",
+# "secrets", "container"); `missing_if` narrows when the missing message applies.
+#
+# Test expressions are tuples:
+#   ("compose",)                       docker-compose.yml was parsed
+#   ("network", name)                  any service joins this network
+#   ("service_name", substrings)       first service whose name contains one
+#   ("service_key", key)               any service defines this key
+#   ("image", ((substr, label), ...))  label of first service image that matches
+#   ("label_key", substrings)          any compose label key contains one
+#   ("docs", keywords)                 CLAUDE.md (lowercased) contains any keyword
+#   ("docs_regex", pattern)            first group of a regex over CLAUDE.md
+#   ("secrets", substrings)            secrets file contains any (case-sensitive)
+#   ("file", "secrets" | relpath)      secrets file / project file exists
+#   ("container", "health"|"healthy")  docker inspect health state
+#   ("container_label", substrings)    any container label key contains one
+#   ("passed", check_id)               value of an earlier check in this pattern
+#   ("value", expr, const)             const when expr is truthy
+#   ("not", expr) / ("any", *exprs) / ("all", *exprs)
+
+DB_IMAGES = (("postgres", "PostgreSQL"), ("mysql", "MySQL"),
+             ("mongo", "MongoDB"), ("redis", "Redis"))
+
+PATTERN_RULES = {
+    "oauth2": {
+        "max": 10,
+        "when": ("compose",),
+        "checks": [
+            {"id": "traefik", "test": ("network", "traefik-net"), "score": 2,
+             "found": "Connected to traefik-net",
+             "missing": "Not connected to traefik-net (required for external access)"},
+            {"id": "oauth2_net", "test": ("network", "oauth2-net"), "score": 2,
+             "found": "Connected to oauth2-net",
+             "missing": "Not using oauth2-net (consider OAuth2 proxy)"},
+            {"id": "keycloak", "test": ("network", "keycloak-net"), "score": 2,
+             "found": "Connected to keycloak-net (direct OIDC)",
+             "missing": "Not using Keycloak SSO",
+             "missing_if": ("not", ("passed", "oauth2_net"))},
+            {"id": "proxy", "test": ("service_name", ("oauth2-proxy", "auth-proxy")), "score": 2,
+             "found": "Uses {} for authentication"},
+            {"id": "oidc", "scope": "secrets",
+             "test": ("secrets", ("OIDC_", "OAUTH2_", "KEYCLOAK_")), "score": 1,
+             "found": "OIDC configuration present"},
+            {"id": "configured", "test": ("any", ("passed", "oidc"), ("passed", "proxy")),
+             "missing": "No OAuth2/OIDC configuration found"},
+            {"id": "documented", "scope": "docs", "test": ("docs", ("oauth2", "keycloak")),
+             "score": 1, "found": "SSO documented in CLAUDE.md",
+             "missing": "SSO configured but not documented",
+             "missing_if": ("passed", "configured")},
+        ],
+    },
+    "database": {
+        "max": 8,
+        # No database integration at all -> the pattern stays silent.
+        "when": ("all", ("compose",),
+                 ("any", ("image", DB_IMAGES), ("network", "db-net"))),
+        "checks": [
+            {"id": "image", "test": ("image", DB_IMAGES)},
+            {"id": "db_net", "test": ("all", ("not", ("passed", "image")), ("network", "db-net")),
+             "score": 2, "found": "Connected to db-net (external database)"},
+            {"id": "db", "test": ("any", ("passed", "image"), ("value", ("passed", "db_net"), "External")),
+             "score": 2, "found": "Uses {}"},
+            {"id": "pooling", "scope": "secrets",
+             "test": ("secrets", ("POOL_SIZE", "MAX_CONNECTIONS", "CONNECTION_POOL")), "score": 1,
+             "found": "Connection pooling configured",
+             "missing": "No connection pooling configuration (recommended for production)"},
+            {"id": "backup", "scope": "docs", "test": ("docs", ("backup",)), "score": 1,
+             "found": "Backup documented", "missing": "Database backup not documented"},
+            {"id": "migration", "scope": "docs",
+             "test": ("docs", ("migration", "schema", "prisma", "alembic", "flyway")), "score": 1,
+             "found": "Schema migration documented",
+             "missing": "Schema migration strategy not documented"},
+            {"id": "secrets_file", "test": ("file", "secrets"), "score": 1,
+             "found": "Database credentials in secrets file", "missing": "No secrets file found"},
+            {"id": "container_health", "test": ("container", "health"), "score": 1,
+             "found": "Container health check configured"},
+        ],
+    },
+    "monitoring": {
+        "max": 6,
+        "when": ("compose",),
+        "checks": [
+            {"id": "loki", "test": ("label_key", ("logging", "loki")), "score": 2,
+             "found": "Loki logging labels configured",
+             "missing": "No Loki logging labels (recommended for centralized logging)"},
+            {"id": "metrics_secrets", "scope": "secrets",
+             "test": ("secrets", ("METRICS", "PROMETHEUS")), "score": 1,
+             "found": "Metrics configuration found"},
+            {"id": "metrics_docs", "scope": "docs",
+             "test": ("all", ("not", ("passed", "metrics_secrets")), ("docs", ("metrics", "prometheus"))),
+             "score": 1, "found": "Metrics mentioned in documentation"},
+            {"id": "metrics", "test": ("any", ("passed", "metrics_secrets"), ("passed", "metrics_docs")),
+             "missing": "No metrics/Prometheus configuration"},
+            {"id": "grafana", "scope": "docs", "test": ("docs", ("grafana", "dashboard")), "score": 1,
+             "found": "Grafana dashboard documented", "missing": "No Grafana dashboard mentioned"},
+            {"id": "logging", "scope": "docs", "test": ("docs", ("log",)), "score": 1,
+             "found": "Logging documented", "missing": "Logging strategy not documented"},
+            {"id": "alerting", "scope": "docs", "test": ("docs", ("alert",)), "score": 1,
+             "found": "Alerting documented"},
+        ],
+    },
+    "ssl_tls": {
+        "max": 5,
+        "checks": [
+            {"id": "https", "scope": "docs",
+             "test": ("docs_regex", r'https://([a-z0-9-]+\.ai-servicers\.com)'), "score": 2,
+             "found": "HTTPS endpoint: {}", "missing": "No HTTPS endpoint documented"},
+            {"id": "traefik_tls", "scope": "container",
+             "test": ("container_label", ("tls", "certresolver")), "score": 2,
+             "found": "Traefik TLS configuration present", "missing": "No Traefik TLS labels found"},
+            {"id": "headers", "scope": "docs",
+             "test": ("docs", ("hsts", "security header", "csp", "x-frame-options")), "score": 1,
+             "found": "Security headers documented"},
+        ],
+    },
+    "health_check": {
+        "max": 4,
+        "when": ("compose",),
+        "checks": [
+            {"id": "healthcheck", "test": ("service_key", "healthcheck"), "score": 2,
+             "found": "Health check defined in docker-compose.yml",
+             "missing": "No health check in docker-compose.yml (recommended)"},
+            {"id": "endpoint", "scope": "docs",
+             "test": ("docs", ("/health", "/healthz", "/ping", "health check", "health endpoint")),
+             "score": 1, "found": "Health endpoint documented",
+             "missing": "Health check configured but not documented",
+             "missing_if": ("passed", "healthcheck")},
+            {"id": "healthy", "test": ("container", "healthy"), "score": 1,
+             "found": "Container currently healthy"},
+        ],
+    },
+    "backup": {
+        "max": 3,
+        "checks": [
+            {"id": "documented", "scope": "docs", "test": ("docs", ("backup",)), "score": 2,
+             "found": "Backup strategy documented", "missing": "No backup strategy documented"},
+            {"id": "script", "test": ("file", "backup.sh"), "score": 1,
+             "found": "Backup script present", "missing": "No backup script found"},
+        ],
+    },
+}
+
+
+class ProjectModel:
+    """Pre-normalized view of a project: every input read and folded exactly once"""
+
+    def __init__(self, project_path, project_name, compose_data, claude_content,
+                 secrets_content, secrets_exists, vocabulary, files, want_container):
+        self.project_path = project_path
+        self.compose = bool(compose_data)
+        self.claude = claude_content
+        self.secrets = secrets_content
+        self.secrets_exists = secrets_exists
+
+        # One walk over the compose services
+        self.networks = set()
+        self.service_names = []
+        self.service_keys = set()
+        self.images = []
+        self.label_keys = []
+        services = (compose_data or {}).get('services', {}) or {}
+        for service_name, service in services.items():
+            service = service or {}
+            self.service_names.append(service_name)
+            self.service_keys.update(service.keys())
+            self.images.append((service.get('image') or '').lower())
+            for network in service.get('networks', []) or []:
+                if isinstance(network, str):
+                    self.networks.add(network)
+            labels = service.get('labels', {})
+            if isinstance(labels, dict):
+                self.label_keys.extend(labels.keys())
+
+        # Keyword hits are resolved against the compiled vocabulary up front, so
+        # each check is a set lookup instead of another pass over the document.
+        self.doc_hits = vocabulary["docs"].hits(claude_content.lower())
+        self.secret_hits = vocabulary["secrets"].hits(secrets_content)
+        self.files = {rel: (project_path / rel).exists() for rel in files}
+
+        # A single docker inspect serves every container check
+        self.container = self._inspect(project_name) if want_container else None
+
+    @staticmethod
+    def _inspect(name):
+        try:
+            result = subprocess.run(
+                ['docker', 'inspect', name],
+                capture_output=True, text=True
+            )
+            if result.returncode == 0:
+                return json.loads(result.stdout)[0]
+        except Exception:
+            pass
+        return None
+
+
+class Vocabulary:
+    """Keyword set matched against a document in one regex pass"""
+
+    def __init__(self, keywords):
+        self.keywords = frozenset(keywords)
+        # Longest first, so at each position the lookahead reports the longest
+        # keyword; shorter keywords it contains are added back from `implies`.
+        ordered = sorted(self.keywords, key=lambda kw: (-len(kw), kw))
+        self.regex = re.compile("(?=(" + "|".join(map(re.escape, ordered)) + "))") if ordered else None
+        self.implies = {kw: {k for k in self.keywords if k in kw} for kw in self.keywords}
+
+    def hits(self, text):
+        """Every keyword occurring in text"""
+        if self.regex is None:
+            return set()
+        found = set()
+        for kw in {m.group(1) for m in self.regex.finditer(text)}:
+            found |= self.implies[kw]
+        return found
+
+
+class CompiledRules:
+    """PATTERN_RULES compiled into closures plus the input vocabulary they need"""
+
+    def __init__(self, rules):
+        self.vocabulary = {"docs": set(), "secrets": set()}
+        self.files = set()
+        self.wants_container = False
+        self.patterns = []
+        for name, rule in rules.items():
+            when = self._compile(rule["when"]) if "when" in rule else None
+            checks = []
+            for check in rule["checks"]:
+                checks.append((
+                    check["id"],
+                    check.get("scope"),
+                    self._compile(check["test"]),
+                    check.get("score", 0),
+                    check.get("found"),
+                    check.get("missing"),
+                    self._compile(check["missing_if"]) if "missing_if" in check else None,
+                ))
+            self.patterns.append((name, rule["max"], when, checks))
+        self.vocabulary = {kind: Vocabulary(kws) for kind, kws in self.vocabulary.items()}
+
+    def _compile(self, expr):
+        kind, args = expr[0], expr[1:]
+
+        if kind == "compose":
+            return lambda m, r: m.compose
+        if kind == "network":
+            network = args[0]
+            return lambda m, r: network in m.networks
+        if kind == "service_name":
+            subs = args[0]
+            return lambda m, r: next((s for s in m.service_names if any(x in s for x in subs)), None)
+        if kind == "service_key":
+            key = args[0]
+            return lambda m, r: key in m.service_keys
+        if kind == "image":
+            table = args[0]
+            return lambda m, r: next((label for image in m.images
+                                      for sub, label in table if sub in image), None)
+        if kind == "label_key":
+            subs = args[0]
+            return lambda m, r: any(x in k for k in m.label_keys for x in subs)
+        if kind == "docs":
+            keywords = frozenset(args[0])
+            self.vocabulary["docs"].update(keywords)
+            return lambda m, r: not keywords.isdisjoint(m.doc_hits)
+        if kind == "docs_regex":
+            regex = re.compile(args[0])
+            def docs_regex(m, r):
+                match = regex.search(m.claude)
+                return match.group(1) if match else None
+            return docs_regex
+        if kind == "secrets":
+            subs = frozenset(args[0])
+            self.vocabulary["secrets"].update(subs)
+            return lambda m, r: not subs.isdisjoint(m.secret_hits)
+        if kind == "file":
+            which = args[0]
+            if which == "secrets":
+                return lambda m, r: m.secrets_exists
+            self.files.add(which)
+            return lambda m, r: m.files[which]
+        if kind == "container":
+            self.wants_container = True
+            if args[0] == "health":
+                return lambda m, r: bool(m.container) and 'Health' in m.container['State']
+            return lambda m, r: bool(m.container) and \
+                (m.container['State'].get('Health') or {}).get('Status') == 'healthy'
+        if kind == "container_label":
+            self.wants_container = True
+            subs = args[0]
+            def container_label(m, r):
+                labels = (m.container or {}).get('Config', {}).get('Labels') or {}
+                return any(x in k.lower() for k in labels for x in subs)
+            return container_label
+        if kind == "passed":
+            check_id = args[0]
+            return lambda m, r: r.get(check_id)
+        if kind == "value":
+            inner, const = self._compile(args[0]), args[1]
+            return lambda m, r: const if inner(m, r) else None
+        if kind == "not":
+            inner = self._compile(args[0])
+            return lambda m, r: not inner(m, r)
+        if kind == "any":
+            inners = [self._compile(a) for a in args]
+            return lambda m, r: next((v for v in (f(m, r) for f in inners) if v), None)
+        if kind == "all":
+            inners = [self._compile(a) for a in args]
+            return lambda m, r: all(f(m, r) for f in inners)
+        raise ValueError(f"Unknown rule expression: {kind}")
+
+    def evaluate(self, model):
+        """Score every pattern against one model in a single pass over the rules"""
+        scope_present = {
+            "docs": bool(model.claude),
+            "secrets": bool(model.secrets),
+            "container": model.container is not None,
+        }
+        results = {}
+        for name, max_score, when, checks in self.patterns:
+            pattern = {"score": 0, "max": max_score, "found": [], "missing": []}
+            results[name] = pattern
+            if when is not None and not when(model, {}):
+                continue
+            passed = {}
+            for check_id, scope, test, score, found, missing, missing_if in checks:
+                if scope and not scope_present[scope]:
+                    continue
+                value = test(model, passed)
+                passed[check_id] = value
+                if value:
+                    pattern["score"] += score
+                    if found:
+                        pattern["found"].append(found.format(value))
+                elif missing and (missing_if is None or missing_if(model, passed)):
+                    pattern["missing"].append(missing)
+        return results
+
+
+COMPILED_RULES = CompiledRules(PATTERN_RULES)
+
 
 class PatternDetector:
-    def __init__(self, project_path="."):
+    def __init__(self, project_path=".", rules=COMPILED_RULES):
         self.project_path = Path(project_path).resolve()
         self.project_name = self.project_path.name
         self.claude_md = self.project_path / "CLAUDE.md"
         self.compose_file = self.project_path / "docker-compose.yml"
         self.secrets_file = Path(f"/home/administrator/projects/secrets/{self.project_name}.env")
+        self.rules = rules
 
         self.patterns = {
-            "oauth2": {"score": 0, "max": 10, "found": [], "missing": []},
-            "database": {"score": 0, "max": 8, "found": [], "missing": []},
-            "monitoring": {"score": 0, "max": 6, "found": [], "missing": []},
-            "ssl_tls": {"score": 0, "max": 5, "found": [], "missing": []},
-            "health_check": {"score": 0, "max": 4, "found": [], "missing": []},
-            "backup": {"score": 0, "max": 3, "found": [], "missing": []}
+            name: {"score": 0, "max": max_score, "found": [], "missing": []}
+            for name, max_score, _, _ in rules.patterns
         }
 
         self.suggestions = []
 
     def detect_all(self):
-        """Run all pattern detection"""
+        """Run all pattern detection. Returns False when there is nothing to analyze"""
 
         if not self.claude_md.exists() and not self.compose_file.exists():
             print(f"No CLAUDE.md or docker-compose.yml found for {self.project_name}")
-            return
+            return False
 
         # Load compose file
-        self.compose_data = None
+        compose_data = None
         if self.compose_file.exists():
             with open(self.compose_file) as f:
-                self.compose_data = yaml.safe_load(f)
+                compose_data = yaml.safe_load(f)
 
         # Load CLAUDE.md
-        self.claude_content = ""
+        claude_content = ""
         if self.claude_md.exists():
-            self.claude_content = self.claude_md.read_text()
+            claude_content = self.claude_md.read_text()
 
         # Load secrets
-        self.secrets_content = ""
-        if self.secrets_file.exists():
-            self.secrets_content = self.secrets_file.read_text()
+        secrets_exists = self.secrets_file.exists()
+        secrets_content = self.secrets_file.read_text() if secrets_exists else ""
+
+        self.model = ProjectModel(
+            self.project_path, self.project_name, compose_data, claude_content,
+            secrets_content, secrets_exists, self.rules.vocabulary,
+            self.rules.files, self.rules.wants_container,
+        )
 
         # Detect patterns
-        self.detect_oauth2_pattern()
-        self.detect_database_pattern()
-        self.detect_monitoring_pattern()
-        self.detect_ssl_tls_pattern()
-        self.detect_health_check_pattern()
-        self.detect_backup_pattern()
+        self.patterns = self.rules.evaluate(self.model)
 
         # Generate suggestions
         self.generate_suggestions()
-
-    def detect_oauth2_pattern(self):
-        """Detect OAuth2/SSO integration pattern"""
-        pattern = self.patterns["oauth2"]
-
-        if not self.compose_data:
-            return
-
-        networks = set()
-        for service_name, service in self.compose_data.get('services', {}).items():
-            if 'networks' in service:
-                for network in service['networks']:
-                    if isinstance(network, str):
-                        networks.add(network)
-
-        # Check for 3-network pattern
-        if 'traefik-net' in networks:
-            pattern["score"] += 2
-            pattern["found"].append("Connected to traefik-net")
-        else:
-            pattern["missing"].append("Not connected to traefik-net (required for external access)")
-
-        if 'oauth2-net' in networks:
-            pattern["score"] += 2
-            pattern["found"].append("Connected to oauth2-net")
-        else:
-            pattern["missing"].append("Not using oauth2-net (consider OAuth2 proxy)")
-
-        if 'keycloak-net' in networks:
-            pattern["score"] += 2
-            pattern["found"].append("Connected to keycloak-net (direct OIDC)")
-        elif 'oauth2-net' not in networks:
-            pattern["missing"].append("Not using Keycloak SSO")
-
-        # Check for oauth2-proxy container
-        has_oauth2_proxy = False
-        for service_name in self.compose_data.get('services', {}).keys():
-            if 'oauth2-proxy' in service_name or 'auth-proxy' in service_name:
-                pattern["score"] += 2
-                pattern["found"].append(f"Uses {service_name} for authentication")
-                has_oauth2_proxy = True
-                break
-
-        # Check for OIDC environment variables
-        has_oidc_config = False
-        if self.secrets_content:
-            oidc_vars = ['OIDC_', 'OAUTH2_', 'KEYCLOAK_']
-            if any(var in self.secrets_content for var in oidc_vars):
-                pattern["score"] += 1
-                pattern["found"].append("OIDC configuration present")
-                has_oidc_config = True
-
-        if not has_oidc_config and not has_oauth2_proxy:
-            pattern["missing"].append("No OAuth2/OIDC configuration found")
-
-        # Check documentation
-        if self.claude_content:
-            if 'oauth2' in self.claude_content.lower() or 'keycloak' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("SSO documented in CLAUDE.md")
-            elif has_oauth2_proxy or has_oidc_config:
-                pattern["missing"].append("SSO configured but not documented")
-
-    def detect_database_pattern(self):
-        """Detect database integration pattern"""
-        pattern = self.patterns["database"]
-
-        if not self.compose_data:
-            return
-
-        # Detect database technology
-        db_found = None
-        for service_name, service in self.compose_data.get('services', {}).items():
-            image = service.get('image', '').lower()
-            if 'postgres' in image:
-                db_found = 'PostgreSQL'
-                break
-            elif 'mysql' in image:
-                db_found = 'MySQL'
-                break
-            elif 'mongo' in image:
-                db_found = 'MongoDB'
-                break
-            elif 'redis' in image:
-                db_found = 'Redis'
-                break
-
-        if not db_found:
-            # Check networks for external database
-            networks = set()
-            for service_name, service in self.compose_data.get('services', {}).items():
-                if 'networks' in service:
-                    for network in service['networks']:
-                        if isinstance(network, str):
-                            networks.add(network)
-
-            if 'db-net' in networks:
-                pattern["score"] += 2
-                pattern["found"].append("Connected to db-net (external database)")
-                db_found = "External"
-            else:
-                return  # No database integration
-
-        if db_found:
-            pattern["score"] += 2
-            pattern["found"].append(f"Uses {db_found}")
-
-        # Check for connection pooling
-        if self.secrets_content:
-            pool_vars = ['POOL_SIZE', 'MAX_CONNECTIONS', 'CONNECTION_POOL']
-            if any(var in self.secrets_content for var in pool_vars):
-                pattern["score"] += 1
-                pattern["found"].append("Connection pooling configured")
-            else:
-                pattern["missing"].append("No connection pooling configuration (recommended for production)")
-
-        # Check for backup configuration
-        if self.claude_content:
-            if 'backup' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("Backup documented")
-            else:
-                pattern["missing"].append("Database backup not documented")
-
-        # Check for migration strategy
-        if self.claude_content:
-            migration_keywords = ['migration', 'schema', 'prisma', 'alembic', 'flyway']
-            if any(kw in self.claude_content.lower() for kw in migration_keywords):
-                pattern["score"] += 1
-                pattern["found"].append("Schema migration documented")
-            else:
-                pattern["missing"].append("Schema migration strategy not documented")
-
-        # Check for secrets management
-        if self.secrets_file.exists():
-            pattern["score"] += 1
-            pattern["found"].append("Database credentials in secrets file")
-        else:
-            pattern["missing"].append("No secrets file found")
-
-        # Check for health check
-        try:
-            result = subprocess.run(
-                ['docker', 'inspect', self.project_name],
-                capture_output=True, text=True
-            )
-            if result.returncode == 0:
-                data = json.loads(result.stdout)[0]
-                if 'Health' in data['State']:
-                    pattern["score"] += 1
-                    pattern["found"].append("Container health check configured")
-        except Exception:
-            pass
-
-    def detect_monitoring_pattern(self):
-        """Detect monitoring/logging integration pattern"""
-        pattern = self.patterns["monitoring"]
-
-        if not self.compose_data:
-            return
-
-        # Check for Loki logging labels
-        has_loki_labels = False
-        for service_name, service in self.compose_data.get('services', {}).items():
-            labels = service.get('labels', {})
-            if isinstance(labels, dict):
-                for key in labels.keys():
-                    if 'logging' in key or 'loki' in key:
-                        pattern["score"] += 2
-                        pattern["found"].append("Loki logging labels configured")
-                        has_loki_labels = True
-                        break
-            if has_loki_labels:
-                break
-
-        if not has_loki_labels:
-            pattern["missing"].append("No Loki logging labels (recommended for centralized logging)")
-
-        # Check for Prometheus metrics
-        has_metrics = False
-        if self.secrets_content:
-            if 'METRICS' in self.secrets_content or 'PROMETHEUS' in self.secrets_content:
-                pattern["score"] += 1
-                pattern["found"].append("Metrics configuration found")
-                has_metrics = True
-
-        if not has_metrics and self.claude_content:
-            if 'metrics' in self.claude_content.lower() or 'prometheus' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("Metrics mentioned in documentation")
-                has_metrics = True
-
-        if not has_metrics:
-            pattern["missing"].append("No metrics/Prometheus configuration")
-
-        # Check for Grafana dashboards
-        if self.claude_content:
-            if 'grafana' in self.claude_content.lower() or 'dashboard' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("Grafana dashboard documented")
-            else:
-                pattern["missing"].append("No Grafana dashboard mentioned")
-
-        # Check for log retention
-        if self.claude_content:
-            if 'log' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("Logging documented")
-            else:
-                pattern["missing"].append("Logging strategy not documented")
-
-        # Check for alerting
-        if self.claude_content:
-            if 'alert' in self.claude_content.lower():
-                pattern["score"] += 1
-                pattern["found"].append("Alerting documented")
-
-    def detect_ssl_tls_pattern(self):
-        """Detect SSL/TLS configuration pattern"""
-        pattern = self.patterns["ssl_tls"]
-
-        # Check for HTTPS URLs
-        if self.claude_content:
-            https_urls = re.findall(r'https://([a-z0-9-]+\.ai-servicers\.com)', self.claude_content)
-            if https_urls:
-                pattern["score"] += 2
-                pattern["found"].append(f"HTTPS endpoint: {https_urls[0]}")
-            else:
-                pattern["missing"].append("No HTTPS endpoint documented")
-
-        # Check for Traefik TLS configuration
-        try:
-            result = subprocess.run(
-                ['docker', 'inspect', self.project_name],
-                capture_output=True, text=True
-            )
-            if result.returncode == 0:
-                data = json.loads(result.stdout)[0]
-                labels = data['Config'].get('Labels', {})
-
-                has_tls = False
-                for key, value in labels.items():
-                    if 'tls' in key.lower() or 'certresolver' in key.lower():
-                        pattern["score"] += 2
-                        pattern["found"].append("Traefik TLS configuration present")
-                        has_tls = True
-                        break
-
-                if not has_tls:
-                    pattern["missing"].append("No Traefik TLS labels found")
-        except Exception:
-            pass
-
-        # Check for security headers
-        if self.claude_content:
-            security_keywords = ['hsts', 'security header', 'csp', 'x-frame-options']
-            if any(kw in self.claude_content.lower() for kw in security_keywords):
-                pattern["score"] += 1
-                pattern["found"].append("Security headers documented")
-
-    def detect_health_check_pattern(self):
-        """Detect health check configuration"""
-        pattern = self.patterns["health_check"]
-
-        if not self.compose_data:
-            return
-
-        # Check docker-compose.yml for healthcheck
-        has_healthcheck = False
-        for service_name, service in self.compose_data.get('services', {}).items():
-            if 'healthcheck' in service:
-                pattern["score"] += 2
-                pattern["found"].append("Health check defined in docker-compose.yml")
-                has_healthcheck = True
-                break
-
-        if not has_healthcheck:
-            pattern["missing"].append("No health check in docker-compose.yml (recommended)")
-
-        # Check for health endpoint
-        if self.claude_content:
-            health_keywords = ['/health', '/healthz', '/ping', 'health check', 'health endpoint']
-            if any(kw in self.claude_content.lower() for kw in health_keywords):
-                pattern["score"] += 1
-                pattern["found"].append("Health endpoint documented")
-            elif has_healthcheck:
-                pattern["missing"].append("Health check configured but not documented")
-
-        # Check actual container health
-        try:
-            result = subprocess.run(
-                ['docker', 'inspect', self.project_name, '--format', '{{.State.Health.Status}}'],
-                capture_output=True, text=True
-            )
-            health = result.stdout.strip()
-            if health == 'healthy':
-                pattern["score"] += 1
-                pattern["found"].append("Container currently healthy")
-        except Exception:
-            pass
-
-    def detect_backup_pattern(self):
-        """Detect backup configuration"""
-        pattern = self.patterns["backup"]
-
-        if self.claude_content:
-            if 'backup' in self.claude_content.lower():
-                pattern["score"] += 2
-                pattern["found"].append("Backup strategy documented")
-            else:
-                pattern["missing"].append("No backup strategy documented")
-
-        # Check for backup scripts
-        backup_script = self.project_path / "backup.sh"
-        if backup_script.exists():
-            pattern["score"] += 1
-            pattern["found"].append("Backup script present")
-        else:
-            pattern["missing"].append("No backup script found")
+        return True
 
     def generate_suggestions(self):
         """Generate improvement suggestions based on detected patterns"""
@@ -499,9 +539,194 @@ class PatternDetector:
 
         print()
 
-if __name__ == "__main__":
-    project = sys.argv[1] if len(sys.argv) > 1 else "."
+class ScoreStore:
+    """Append-only SQLite time series of pattern scores, one row per project/pattern/run"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS scores (
+            ts        TEXT NOT NULL,
+            project   TEXT NOT NULL,
+            pattern   TEXT NOT NULL,
+            score     INTEGER NOT NULL,
+            max_score INTEGER NOT NULL,
+            missing   TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS scores_pattern_ts ON scores (pattern, ts);
+        CREATE INDEX IF NOT EXISTS scores_project_ts ON scores (project, ts);
+    """
+
+    def __init__(self, db_path=SCORE_DB):
+        self.db = sqlite3.connect(str(db_path))
+        self.db.executescript(self.SCHEMA)
+
+    def record(self, results, ts=None):
+        """Append one run: results is {project: patterns} as produced by PatternDetector"""
+        ts = ts or datetime.now(timezone.utc).isoformat(timespec="seconds")
+        rows = [
+            (ts, project, name, p["score"], p["max"], json.dumps(p["missing"]))
+            for project, patterns in results.items()
+            for name, p in patterns.items()
+        ]
+        with self.db:
+            self.db.executemany("INSERT INTO scores VALUES (?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def history(self, project, pattern=None, since=None):
+        """Rows for one project, oldest first"""
+        sql = "SELECT ts, pattern, score, max_score, missing FROM scores WHERE project = ?"
+        params = [project]
+        if pattern:
+            sql += " AND pattern = ?"
+            params.append(pattern)
+        if since:
+            sql += " AND ts >= ?"
+            params.append(since)
+        return self.db.execute(sql + " ORDER BY ts, pattern, rowid", params).fetchall()
+
+    def dropped(self, pattern, below, since):
+        """Projects whose latest score is under `below`% but were at/above it since `since`.
+
+        The last sample before the window counts as the starting point, so a project
+        that entered the window healthy and then regressed is reported. Runs recorded
+        within the same second are told apart by insertion order.
+        """
+        sql = """
+            WITH pct AS (
+                SELECT project, ts, rowid AS seq, 100.0 * score / max_score AS pct
+                FROM scores WHERE pattern = ? AND max_score > 0
+            ),
+            latest AS (
+                SELECT project, pct, ts FROM (
+                    SELECT project, pct, ts,
+                           ROW_NUMBER() OVER (PARTITION BY project ORDER BY ts DESC, seq DESC) AS rn
+                    FROM pct
+                ) WHERE rn = 1
+            ),
+            baseline AS (
+                SELECT project, MAX(ts) AS ts FROM pct WHERE ts < ? GROUP BY project
+            ),
+            peak AS (
+                SELECT p.project, MAX(p.pct) AS pct FROM pct p
+                LEFT JOIN baseline b ON b.project = p.project
+                WHERE p.ts >= COALESCE(b.ts, ?)
+                GROUP BY p.project
+            )
+            SELECT latest.project, peak.pct, latest.pct, latest.ts
+            FROM latest JOIN peak ON peak.project = latest.project
+            WHERE latest.pct < ? AND peak.pct >= ?
+            ORDER BY latest.pct, latest.project
+        """
+        return self.db.execute(sql, (pattern, since, since, below, below)).fetchall()
+
+
+def parse_since(s):
+    """'30d' '2w' '1m' -> ISO timestamp that many days/weeks/months ago (UTC)"""
+    m = re.fullmatch(r"(\d+)\s*([dwm]?)", s.strip().lower())
+    if not m:
+        raise SystemExit(f"bad --since value: {s!r} (use e.g. 30d, 2w, 1m)")
+    days = int(m.group(1)) * {"d": 1, "w": 7, "m": 30}[m.group(2) or "d"]
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat(timespec="seconds")
+
+
+def discover_projects(root=PROJECTS_ROOT):
+    """Project dirs under root that have something to analyze"""
+    return [
+        d for d in sorted(root.iterdir())
+        if d.is_dir() and d.name not in SKIP_DIRS
+        and ((d / "CLAUDE.md").exists() or (d / "docker-compose.yml").exists())
+    ]
+
+
+def score_project(path):
+    """Score one project without printing; returns (name, patterns) or (name, None)"""
+    detector = PatternDetector(path)
+    try:
+        detector.detect_all()
+    except Exception as e:
+        print(f"  ✗ {detector.project_name}: {e}", file=sys.stderr)
+        return detector.project_name, None
+    return detector.project_name, detector.patterns
+
+
+def score_fleet(jobs, root=PROJECTS_ROOT):
+    """Score every project in parallel: {project: patterns}"""
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        scored = pool.map(score_project, discover_projects(root))
+        return {name: patterns for name, patterns in scored if patterns is not None}
+
+
+def pct(pattern):
+    return (pattern["score"] / pattern["max"] * 100) if pattern["max"] > 0 else 0
+
+
+def print_fleet(results):
+    """One row per project, worst overall score first"""
+    names = list(PATTERN_RULES)
+    print(f"\n=== Fleet Pattern Scores ({len(results)} projects) ===\n")
+    print(f"{'Project':<25} {'Overall':>7}  " + " ".join(f"{n[:8]:>8}" for n in names))
+
+    def overall(patterns):
+        total_max = sum(p["max"] for p in patterns.values())
+        return sum(p["score"] for p in patterns.values()) / total_max * 100 if total_max else 0
+
+    for project, patterns in sorted(results.items(), key=lambda kv: overall(kv[1])):
+        cols = " ".join(f"{pct(patterns[n]):>7.0f}%" for n in names)
+        print(f"{project[:25]:<25} {overall(patterns):>6.0f}%  {cols}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect infrastructure patterns and track scores over time")
+    parser.add_argument("project", nargs="?", default=".", help="Project path (default: cwd)")
+    parser.add_argument("--all", action="store_true", help=f"Score every project under {PROJECTS_ROOT}")
+    parser.add_argument("--jobs", "-j", type=int, default=8, help="Parallel workers for --all (default 8)")
+    parser.add_argument("--no-record", action="store_true", help="Don't append --all results to the score history")
+    parser.add_argument("--record", action="store_true", help="Append a single-project run to the score history")
+    parser.add_argument("--history", metavar="PROJECT", help="Show recorded scores for a project")
+    parser.add_argument("--dropped", metavar="PATTERN", choices=list(PATTERN_RULES),
+                        help="Projects that fell below --below%% on PATTERN within --since")
+    parser.add_argument("--below", type=float, default=50, help="Threshold percent for --dropped (default 50)")
+    parser.add_argument("--since", default="30d", help="Window for --dropped/--history (default 30d)")
+    parser.add_argument("--root", default=str(PROJECTS_ROOT), help=f"Projects root for --all (default {PROJECTS_ROOT})")
+    parser.add_argument("--db", default=str(SCORE_DB), help=f"Score history database (default {SCORE_DB})")
+    args = parser.parse_args()
+
+    if args.dropped:
+        rows = ScoreStore(args.db).dropped(args.dropped, args.below, parse_since(args.since))
+        if not rows:
+            print(f"No projects dropped below {args.below:.0f}% on {args.dropped} in the last {args.since}")
+            return
+        print(f"\nProjects below {args.below:.0f}% on {args.dropped} (were at/above within {args.since}):\n")
+        for project, peak, latest, ts in rows:
+            print(f"  ❌ {project:<25} {peak:>4.0f}% → {latest:>4.0f}%  (latest {ts})")
+        print()
+        return
+
+    if args.history:
+        rows = ScoreStore(args.db).history(args.history, since=parse_since(args.since))
+        if not rows:
+            print(f"No recorded scores for {args.history} in the last {args.since}")
+            return
+        print(f"\n=== Score history for {args.history} ===\n")
+        for ts, pattern, score, max_score, missing in rows:
+            print(f"  {ts}  {pattern:<13} {score:>2}/{max_score:<2}  missing: {len(json.loads(missing))}")
+        print()
+        return
 
-    detector = PatternDetector(project)
-    detector.detect_all()
-    detector.print_report()
+    if args.all:
+        results = score_fleet(args.jobs, Path(args.root))
+        print_fleet(results)
+        if not args.no_record and results:
+            rows = ScoreStore(args.db).record(results)
+            print(f"Recorded {rows} scores → {args.db}")
+        return
+
+    detector = PatternDetector(args.project)
+    analyzed = detector.detect_all()
+    detector.print_report()  # a project with no inputs still gets its zero-score report
+    if args.record and analyzed:
+        ScoreStore(args.db).record({detector.project_name: detector.patterns})
+
+
+if __name__ == "__main__":
+    main()
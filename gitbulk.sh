@@ -0,0 +1,159 @@
+# shellcheck shell=bash
+# Bulk-run helpers shared by gitpull and gitpush; sourced, not executed.
+# Expects DEFAULT_BRANCH to be set by the caller.
+
+GITBULK_DIR="$(dirname "$(readlink -f "${BASH_SOURCE[0]}")")"
+
+# ── Shared SSH connections for bulk runs ──
+# A bulk run talks to one or two hosts (github.com, gitlab:2222) for every
+# repo. One ControlMaster per host is opened up front and every git fetch /
+# ls-remote / push rides on it via GIT_SSH_COMMAND, instead of paying a TCP +
+# SSH handshake per operation. A GIT_SSH_COMMAND/GIT_SSH already set by the
+# caller is left alone, and so are repos with their own core.sshCommand (e.g.
+# a per-repo `-i key`): they get no master and keep their configured command.
+SSH_MUX_DIR=""
+declare -a SSH_MUX_TARGETS=()
+LS_REMOTE_DIR=""
+
+# Print ssh destination args for an SSH remote URL; fail for file/https remotes.
+ssh_target() {
+  local url="$1"
+  if [[ "${url}" =~ ^ssh://([^/]+)/ ]]; then
+    local authority="${BASH_REMATCH[1]}"
+    if [[ "${authority}" =~ ^(.+):([0-9]+)$ ]]; then
+      echo "-p ${BASH_REMATCH[2]} ${BASH_REMATCH[1]}"
+    else
+      echo "${authority}"
+    fi
+  elif [[ "${url}" != *://* && "${url}" =~ ^([^/:]+): ]]; then  # scp-like user@host:path
+    echo "${BASH_REMATCH[1]}"
+  else
+    return 1
+  fi
+}
+
+# ssh_mux_start <repo dir>...: open one background master per distinct host.
+ssh_mux_start() {
+  [[ -n "${GIT_SSH_COMMAND:-}${GIT_SSH:-}" ]] && return 0
+  SSH_MUX_DIR=$(mktemp -d "${TMPDIR:-/tmp}/gitmux.XXXXXX")
+  local opts="-o ControlPath=${SSH_MUX_DIR}/%C -o ControlPersist=300"
+  export GIT_SSH_COMMAND="ssh -o ControlMaster=auto ${opts}"
+
+  local dir url target
+  declare -A seen=()
+  for dir in "$@"; do
+    repo_ssh_command "${dir}" >/dev/null && continue
+    url=$(git -C "${dir}" remote get-url origin 2>/dev/null) || continue
+    target=$(ssh_target "${url}") || continue
+    [[ -n "${seen[${target}]:-}" ]] && continue
+    seen["${target}"]=1
+    SSH_MUX_TARGETS+=("${target}")
+    # shellcheck disable=SC2086 # target/opts are deliberately word-split
+    timeout 10 ssh -o ControlMaster=yes ${opts} -o BatchMode=yes -o ConnectTimeout=5 -fN ${target} \
+      >/dev/null 2>&1 &
+  done
+  wait
+  if [[ ${#SSH_MUX_TARGETS[@]} -gt 0 ]]; then
+    echo "🔌 Sharing SSH connections to: ${SSH_MUX_TARGETS[*]}"
+  fi
+}
+
+# repo_ssh_command <repo dir>: print the repo's core.sshCommand while the mux
+# is active. The exported GIT_SSH_COMMAND outranks it, so callers re-export
+# this for that repo's git operations instead.
+repo_ssh_command() {
+  [[ -n "${SSH_MUX_DIR}" ]] || return 1
+  git -C "$1" -c safe.directory="$1" config --get core.sshCommand 2>/dev/null
+}
+
+ssh_mux_stop() {
+  [[ -n "${SSH_MUX_DIR}" ]] || return 0
+  local target
+  for target in "${SSH_MUX_TARGETS[@]}"; do
+    # shellcheck disable=SC2086
+    ssh -o ControlPath="${SSH_MUX_DIR}/%C" -O exit ${target} >/dev/null 2>&1 || true
+  done
+  rm -rf "${SSH_MUX_DIR}"
+  SSH_MUX_DIR=""
+}
+
+# prefetch_ls_remote <refs pattern> <name>=<dir>...: one bounded-parallel
+# ls-remote pass over every repo before the bulk loop, so repos whose origin
+# has not moved can skip their fetch (see origin_unchanged).
+prefetch_ls_remote() {
+  local patterns="$1"
+  shift
+  LS_REMOTE_DIR=$(mktemp -d "${TMPDIR:-/tmp}/gitlsr.XXXXXX")
+  local pair name dir started=0 finished f
+  for pair in "$@"; do
+    name="${pair%%=*}"
+    dir="${pair#*=}"
+    (
+      own_ssh=$(repo_ssh_command "${dir}") && export GIT_SSH_COMMAND="${own_ssh}"
+      # shellcheck disable=SC2086 # patterns is a list of ref globs
+      timeout 10 git -C "${dir}" ls-remote origin ${patterns} >"${LS_REMOTE_DIR}/${name//\//__}" 2>/dev/null \
+        || rm -f "${LS_REMOTE_DIR}/${name//\//__}"
+      : >"${LS_REMOTE_DIR}/.done.${started}"
+    ) &
+    started=$((started + 1))
+    # At most 8 in flight; finished workers leave a .done marker
+    while :; do
+      finished=0
+      for f in "${LS_REMOTE_DIR}"/.done.*; do
+        [[ -e "${f}" ]] && finished=$((finished + 1))
+      done
+      (( started - finished < 8 )) && break
+      sleep 0.05
+    done
+  done
+  wait
+}
+
+# origin_unchanged <name>: true when the prefetched ls-remote shows no ref the
+# local repo (cwd) lacks, i.e. a fetch would bring nothing new.
+origin_unchanged() {
+  local file="${LS_REMOTE_DIR}/${1//\//__}"
+  [[ -n "${LS_REMOTE_DIR}" && -s "${file}" ]] || return 1
+  local sha ref local_ref
+  while read -r sha ref; do
+    case "${ref}" in
+      *'^{}') continue ;;
+      "refs/heads/${DEFAULT_BRANCH}") local_ref="refs/remotes/origin/${DEFAULT_BRANCH}" ;;
+      refs/tags/*) local_ref="${ref}" ;;
+      *) continue ;;
+    esac
+    [[ "$(git rev-parse -q --verify "${local_ref}" 2>/dev/null)" == "${sha}" ]] || return 1
+  done <"${file}"
+}
+
+# ── Fleet git state for bulk runs ──
+# One `gitstate` pass scans every repo in parallel before the bulk loop, so
+# per-repo dirty/ahead checks read REPO_STATE instead of each repo paying its
+# own `git status` walk. Repos the scan could not read have no entry and take
+# the normal per-repo path.
+declare -A REPO_STATE=()
+
+# scan_git_state <dir>...: fill REPO_STATE[<dir>] from one gitstate --tsv run
+scan_git_state() {
+  local scanner
+  scanner="${GITBULK_DIR}/gitstate"
+  [[ -x "${scanner}" ]] || scanner="$(command -v gitstate)" || return 0
+  local path fields dirty=0 ahead=0 stashed=0
+  local branch upstream n_ahead behind staged unstaged untracked conflicts stash
+  while IFS=$'\t' read -r path fields; do
+    REPO_STATE["${path}"]="${fields}"
+    IFS=$'\t' read -r branch upstream n_ahead behind staged unstaged untracked conflicts stash <<<"${fields}"
+    dirty=$((dirty + (staged + unstaged + conflicts > 0)))
+    ahead=$((ahead + (n_ahead > 0)))
+    stashed=$((stashed + (stash > 0)))
+  done < <("${scanner}" --tsv "$@" 2>/dev/null)
+  echo "🔎 Scanned ${#REPO_STATE[@]} repos: ${dirty} dirty, ${ahead} ahead of upstream, ${stashed} with stashes"
+}
+
+# repo_state <dir>: load <dir>'s scanned state into RS_* (1 when not scanned)
+repo_state() {
+  local key="${1%/}"
+  [[ -n "${REPO_STATE[${key}]+x}" ]] || return 1
+  IFS=$'\t' read -r RS_BRANCH RS_UPSTREAM RS_AHEAD RS_BEHIND RS_STAGED RS_UNSTAGED \
+    RS_UNTRACKED RS_CONFLICTS RS_STASH <<<"${REPO_STATE[${key}]}"
+}
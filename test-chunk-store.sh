@@ -0,0 +1,115 @@
+#!/usr/bin/env bash
+# Smoke test for backup/chunk-store.py, the dedup engine behind
+# `BACKUP_MODE=dedup backup-projects-data.sh`. Run from anywhere. Backs up a
+# throwaway tree twice, edits one large file in the middle, then checks
+# dedup, restore, verify, corruption detection, gc, unreadable files and
+# hardlinks.
+set -uo pipefail
+
+CS="$(cd "$(dirname "$0")" && pwd)/backup/chunk-store.py"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+has() { grep -q -- "$1" "$2" && ok "$3" || no "$3"; }
+
+[ -x "$CS" ] || { echo "missing $CS"; exit 1; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+S="$T/store" SRC="$T/projects"
+mkdir -p "$SRC/data/db" "$SRC/data/logs" "$SRC/data/empty"
+head -c 12000000 /dev/urandom >"$SRC/data/db/big.bin"
+printf 'hello\n' >"$SRC/data/a.txt"
+seq 1 5000 >"$SRC/data/db/rows.csv"
+echo noise >"$SRC/data/logs/app.log"
+ln -s a.txt "$SRC/data/link"
+chmod 640 "$SRC/data/a.txt"
+touch -d '2020-01-02 03:04:05' "$SRC/data/a.txt"
+backup() { "$CS" backup --store "$S" --name "$1" -C "$SRC" data --exclude 'data/logs/*.log'; }
+
+echo "== backup =="
+backup data-daily-1 >"$T/b1" 2>&1 && ok "first backup succeeds" || no "first backup succeeds"
+has "verified" "$T/b1" "new chunks verified after write"
+backup data-daily-2 >"$T/b2" 2>&1
+has "read 0 B from 0 changed files" "$T/b2" "unchanged rerun reads nothing"
+has " 0 new chunks, 0 B written" "$T/b2" "unchanged rerun writes nothing"
+
+python3 - "$SRC/data/db/big.bin" <<'PY'
+import sys
+p = sys.argv[1]
+b = open(p, "rb").read()
+open(p, "wb").write(b[:6000000] + b"inserted" + b[6000000:])
+PY
+backup data-daily-3 >"$T/b3" 2>&1
+new="$(sed -n 's/.* \([0-9]*\) new chunks.*/\1/p' "$T/b3")"
+total="$(find "$S/chunks" -type f | wc -l)"
+[ -n "$new" ] && [ "$new" -ge 1 ] && [ "$new" -le 3 ] \
+  && ok "mid-file insert stores only nearby chunks ($new new of $total)" || no "mid-file insert stores only nearby chunks (${new:-?} new)"
+
+echo "== list / verify / restore =="
+"$CS" list --store "$S" >"$T/list" 2>&1
+[ "$(grep -c 'data-daily-' "$T/list")" -eq 3 ]             && ok "list shows three snapshots"   || no "list shows three snapshots"
+"$CS" verify --store "$S" >"$T/v" 2>&1                      && ok "verify passes"                || no "verify passes"
+has "3 snapshot(s).*: ok" "$T/v" "verify reports ok"
+
+"$CS" restore --store "$S" data-daily-3 "$T/r" >/dev/null 2>&1 && ok "restore succeeds" || no "restore succeeds"
+cp -a "$SRC" "$T/expect" && rm "$T/expect/data/logs/app.log"
+diff -r --no-dereference "$T/expect/data" "$T/r/data" >/dev/null && ok "restored tree matches source minus excludes" \
+  || no "restored tree matches source minus excludes"
+[ "$(stat -c '%a %Y' "$T/r/data/a.txt")" = "$(stat -c '%a %Y' "$SRC/data/a.txt")" ] \
+  && ok "mode and mtime restored" || no "mode and mtime restored"
+[ "$(readlink "$T/r/data/link")" = a.txt ]                  && ok "symlink restored"             || no "symlink restored"
+"$CS" restore --store "$S" data-daily-1 "$T/p" --path data/db >/dev/null 2>&1
+[ -f "$T/p/data/db/rows.csv" ] && [ ! -e "$T/p/data/a.txt" ] && ok "--path restores one subtree" || no "--path restores one subtree"
+
+echo "== damage =="
+h="$(zcat "$S/snapshots/data-daily-3.json.gz" | sed -n 's|.*"path":"data/db/big.bin".*"chunks":\["\([0-9a-f]*\)".*|\1|p')"
+victim="$S/chunks/${h:0:2}/$h"; [ -f "$victim" ] || no "big.bin chunk found in manifest"
+cp "$victim" "$T/victim"
+printf 'x' | dd of="$victim" bs=1 seek=1000 conv=notrunc status=none   # inside the zlib stream
+"$CS" verify --store "$S" >"$T/v2" 2>&1                     && no "corrupt chunk fails verify"   || ok "corrupt chunk fails verify"
+"$CS" verify --store "$S" --quick >/dev/null 2>&1           && ok "--quick only checks presence" || no "--quick only checks presence"
+"$CS" restore --store "$S" data-daily-3 "$T/r2" >/dev/null 2>&1 && no "restore refuses a corrupt chunk" || ok "restore refuses a corrupt chunk"
+cp "$T/victim" "$victim"
+
+m="$S/snapshots/data-daily-2.json.gz"
+cp "$m" "$T/m.bak"
+zcat "$T/m.bak" | sed '2s/"mode":[0-9]*/"mode":511/' | gzip >"$m"
+"$CS" verify --store "$S" data-daily-2 --quick >/dev/null 2>&1 && no "tampered manifest fails verify" || ok "tampered manifest fails verify"
+"$CS" gc --store "$S" >"$T/gc0" 2>&1                        && no "gc refuses with an unreadable manifest" || ok "gc refuses with an unreadable manifest"
+cp "$T/m.bak" "$m"
+
+echo "== gc =="
+"$CS" gc --store "$S" >"$T/gc1" 2>&1
+has " 0 removed" "$T/gc1" "gc keeps every referenced chunk"
+rm "$S/snapshots/data-daily-1.json.gz" "$S/snapshots/data-daily-2.json.gz"
+"$CS" gc --store "$S" >"$T/gc2" 2>&1
+removed="$(sed -n 's/.* \([0-9]*\) removed.*/\1/p' "$T/gc2")"
+[ "${removed:-0}" -ge 1 ] && ok "gc drops chunks only old snapshots used ($removed)" || no "gc drops chunks only old snapshots used"
+"$CS" verify --store "$S" >/dev/null 2>&1                   && ok "remaining snapshot still verifies" || no "remaining snapshot still verifies"
+
+echo "== unreadable files / hardlinks =="
+U="$T/u" US="$T/us"
+mkdir -p "$U/data" "$US" && chmod 755 "$T" && chmod 777 "$US"
+echo ok >"$U/data/ok.txt"; echo secret >"$U/data/secret"; chmod 000 "$U/data/secret"
+echo shared >"$U/data/h1"; ln "$U/data/h1" "$U/data/h2"
+drop=()                                          # root reads anything: drop to nobody for the first run
+[ "$(id -u)" -eq 0 ] && drop=(setpriv --reuid=65534 --regid=65534 --clear-groups)
+cp "$CS" "$T/cs.py" && chmod 755 "$T/cs.py"      # the checkout may not be readable by nobody
+"${drop[@]}" "$T/cs.py" backup --store "$US" --name u-1 -C "$U" data >"$T/u1" 2>&1; rc=$?
+[ "$rc" -eq 3 ]                                           && ok "unreadable file -> exit 3"      || no "unreadable file -> exit 3 (got $rc)"
+has "secret: Permission denied; not in snapshot" "$T/u1" "unreadable file named in a warning"
+"$CS" list --store "$US" 2>&1 | grep -q "u-1 .*incomplete: 1 missing" && ok "list flags the snapshot incomplete" || no "list flags the snapshot incomplete"
+"$CS" restore --store "$US" u-1 "$T/ur" >/dev/null 2>&1
+[ -f "$T/ur/data/ok.txt" ] && [ ! -e "$T/ur/data/secret" ] && ok "unreadable file left out, not empty" || no "unreadable file left out, not empty"
+[ "$(stat -c %i "$T/ur/data/h1")" = "$(stat -c %i "$T/ur/data/h2")" ] && [ "$(cat "$T/ur/data/h2")" = shared ] \
+  && ok "hardlinks restored as links" || no "hardlinks restored as links"
+[ "$(id -u)" -eq 0 ] || chmod 600 "$U/data/secret"
+"$CS" backup --store "$US" --name u-2 -C "$U" data >"$T/u2" 2>&1 && ok "readable again -> exit 0" || no "readable again -> exit 0"
+"$CS" restore --store "$US" u-2 "$T/ur2" --path data/secret >/dev/null 2>&1
+[ "$(cat "$T/ur2/data/secret" 2>/dev/null)" = secret ]    && ok "next run retries the file"      || no "next run retries the file"
+"$CS" restore --store "$US" u-2 "$T/ur3" --path data/h2 >/dev/null 2>&1
+[ "$(cat "$T/ur3/data/h2" 2>/dev/null)" = shared ]        && ok "--path restores a link without its first name" || no "--path restores a link without its first name"
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
@@ -0,0 +1,148 @@
+#!/usr/bin/env bash
+# Offline smoke test for claude-sessions. Builds transcripts under a temp HOME
+# and checks the session catalog (listing, resuming a transcript that grew,
+# rescanning one that was truncated or rewritten), the --grep index, the
+# --stats rollups and the lazily ordered listing.
+set -uo pipefail
+
+CS="$(cd "$(dirname "$0")" && pwd)/claude-sessions"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+is()  { [ "$2" = "$3" ] && ok "$1" || no "$1 (got '$2', want '$3')"; }
+
+[ -x "$CS" ] || { echo "missing $CS"; exit 1; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+export HOME="$T/home" XDG_CACHE_HOME="$T/cache"
+P="$HOME/.claude/projects/-srv-demo"
+mkdir -p "$P"
+S1=11111111-1111-4111-8111-111111111111
+F1="$P/$S1.jsonl"
+
+# msg <type> <timestamp> <text>: one transcript line
+msg() { printf '{"type":"%s","timestamp":"%s","message":{"role":"%s","content":"%s"}}\n' "$1" "$2" "$1" "$3"; }
+list() { "$CS" --all --json 2>/dev/null; }
+field() { list | jq -r --arg s "$1" ".[] | select(.sessionId == \$s) | .$2"; }
+
+echo "== catalog =="
+{ printf '{"type":"summary","leafUuid":"x"}\n'
+  msg user      2026-10-01T09:00:00Z "fix the login page"
+  msg assistant 2026-10-01T09:01:00Z "done"; } >"$F1"
+is "transcript listed"                  "$(list | jq 'length')" 1
+is "first prompt shown"                 "$(field $S1 firstPrompt)" "fix the login page"
+is "created is the first timestamp"     "$(field $S1 created)" 2026-10-01T09:00:00Z
+is "user+assistant messages counted"    "$(field $S1 messageCount)" 2
+is "project path decoded"               "$(field $S1 projectPath)" /srv/demo
+
+# Rewrite the first prompt in place (same length) while appending: a resumed
+# scan never looks behind its stored offset, a rescan would see the new text.
+python3 -c 'import sys; f = open(sys.argv[1], "r+b"); b = f.read(); f.seek(0)
+f.write(b.replace(b"fix the login page", b"FIX THE LOGIN PAGE"))' "$F1"   # same inode
+{ msg user 2026-10-02T10:00:00Z "and the logout page"
+  msg assistant 2026-10-02T10:05:00Z "ok"; } >>"$F1"
+is "append: messageCount updated"       "$(field $S1 messageCount)" 4
+is "append: modified updated"           "$(field $S1 modified)" 2026-10-02T10:05:00Z
+is "append: resumed, not rescanned"     "$(field $S1 firstPrompt)" "fix the login page"
+
+# A half-written last line is left for the next run
+printf '{"type":"user","timestamp":"2026-10-03T08:00:00Z","mess' >>"$F1"
+is "partial line not counted yet"       "$(field $S1 messageCount)" 4
+printf 'age":{"role":"user","content":"more"}}\n' >>"$F1"
+is "completed line counted"             "$(field $S1 messageCount)" 5
+
+# Truncated in place (same inode, shorter than the stored offset)
+{ msg user 2026-10-04T07:00:00Z "fresh start"; } >"$F1"
+is "truncated: rescanned from zero"     "$(field $S1 messageCount)" 1
+is "truncated: new first prompt"        "$(field $S1 firstPrompt)" "fresh start"
+
+# Rewritten as a new file (new inode) that is longer than before
+{ msg user 2026-10-05T07:00:00Z "rewritten"; msg assistant 2026-10-05T07:01:00Z "a"
+  msg user 2026-10-05T07:02:00Z "b"; } >"$T/new" && mv "$T/new" "$F1"
+is "rewritten: rescanned from zero"     "$(field $S1 messageCount)" 3
+is "rewritten: new first prompt"        "$(field $S1 firstPrompt)" rewritten
+is "--rebuild agrees"                   "$("$CS" --all --json --rebuild 2>/dev/null | jq -r '.[0].messageCount')" 3
+
+echo "== --grep =="
+S2=22222222-2222-4222-8222-222222222222
+F2="$P/$S2.jsonl"
+{ msg user 2026-10-06T09:00:00Z "the disk filled up with ENOSPC"
+  printf '{"type":"assistant","timestamp":"2026-10-06T09:01:00Z","message":{"role":"assistant","content":[{"type":"tool_use","name":"Edit","input":{"file_path":"/srv/demo/diskwatch.py"}}]}}\n'
+} >"$F2"
+grep_json() { "$CS" --grep "$1" --json 2>/dev/null; }
+is "first build finds a prompt"         "$(grep_json ENOSPC | jq -r '.[] | .sessionId + " " + .role')" "$S2 user"
+is "tool-call paths are indexed"        "$(grep_json diskwatch | jq -r '.[0].role')" assistant
+msg user 2026-10-06T09:05:00Z "now the zebra service" >>"$F2"
+is "appended line becomes searchable"   "$(grep_json zebra | jq -r '.[0].sessionId')" "$S2"
+is "earlier hits still there"           "$(grep_json ENOSPC | jq 'length')" 1
+rm "$F2"
+is "deleted transcript drops out"       "$("$CS" --grep ENOSPC 2>/dev/null)" "No matches found."
+
+echo "== --stats =="
+export TZ=UTC   # rollup days are local days
+Q="$HOME/.claude/projects/-srv-stats"; mkdir -p "$Q"
+F3="$Q/33333333-3333-4333-8333-333333333333.jsonl"
+tool() { printf '{"type":"tool_use","name":"%s","input":{"%s":"%s"}}' "$1" "$2" "$3"; }
+calls() { printf '{"type":"assistant","timestamp":"%s","message":{"role":"assistant","content":[%s]}}\n' "$1" "$2"; }
+{ msg user 2026-10-07T10:00:00Z "go"
+  calls 2026-10-07T10:01:00Z "$(tool Bash command 'git add -A && git commit -m x'),$(tool Bash command 'echo \"git commit\"'),$(tool Edit file_path /srv/stats/a.py),$(tool Bash command 'git commit --amend')"
+  msg user 2026-10-07T10:02:00Z "again"; } >"$F3"
+stats_json() { "$CS" --stats --since 2026-10-01 --until 2026-10-31 -p stats --json 2>/dev/null | jq -c ".projects[0] | [$1]"; }
+is "one day rolled up"                  "$(stats_json '.days, .turns, .messages, .toolCalls, .filesEdited, .activeSeconds')" "[1,2,3,4,1,120]"
+is "only real git commits counted"      "$(stats_json .commits)" "[1]"
+is "tools tallied"                      "$(stats_json '.tools.Bash, .tools.Edit')" "[3,1]"
+{ msg user 2026-10-08T11:00:00Z "next day"
+  calls 2026-10-08T11:03:00Z "$(tool Bash command 'git -C /x commit -m y; git commit -m z')"; } >>"$F3"
+is "new day added, nothing counted twice" "$(stats_json '.days, .turns, .messages, .toolCalls, .commits, .activeSeconds')" "[2,3,5,5,3,300]"
+is "range picks days"                   "$("$CS" --stats --since 2026-10-08 --until 2026-10-08 -p stats --json | jq -c '.projects[0] | [.days, .commits]')" "[1,2]"
+python3 - "$CS" <<'PY' && ok "GIT_COMMIT_RE matches commands, not mentions" || no "GIT_COMMIT_RE matches commands, not mentions"
+import sys
+from importlib.machinery import SourceFileLoader
+cs = SourceFileLoader("claude_sessions", sys.argv[1]).load_module()
+cases = {"git commit -m x": 1, "git add -A && git commit -m x && git push": 1,
+         "cd a\ngit commit -qm b": 1, "GIT_AUTHOR_NAME=x git commit -m y": 1,
+         "(git commit -m a) || git -C /r commit -m b": 2,
+         'echo "git commit"': 0, "grep -n 'git commit' log": 0, "git commit --amend --no-edit": 0,
+         "git commit-tree abc": 0, "git commits": 0, "mygit commit": 0}
+bad = {c: n for c, n in cases.items() if len(cs.GIT_COMMIT_RE.findall(c)) != n}
+assert not bad, bad
+PY
+
+echo "== lazy listing order =="
+python3 - "$CS" <<'PY' >"$T/order.out" 2>&1 && ok "lazy listing matches a full sort, also when a file vanishes" \
+  || { no "lazy listing matches a full sort, also when a file vanishes"; cat "$T/order.out"; }
+import json, os, random, shutil, sys
+from importlib.machinery import SourceFileLoader
+cs = SourceFileLoader("claude_sessions", sys.argv[1]).load_module()
+shutil.rmtree(cs.PROJECTS_DIR)
+rng = random.Random(7)
+created = {}
+for n in range(40):
+    d = cs.PROJECTS_DIR / f"-srv-p{n % 4}"
+    d.mkdir(parents=True, exist_ok=True)
+    sid = f"{n:08x}-0000-4000-8000-000000000000"
+    start = 1_790_000_000 + rng.randrange(10**6) * 60 + n  # distinct start times
+    ts = lambda t: cs.datetime.fromtimestamp(t, cs.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    with open(d / f"{sid}.jsonl", "w") as fh:
+        for k in range(3):
+            fh.write(json.dumps({"type": "user", "timestamp": ts(start + k * 60),
+                                 "message": {"role": "user", "content": f"task {n}"}}) + "\n")
+    end = start + rng.randrange(120, 10**6)  # written later, by a random amount
+    os.utime(d / f"{sid}.jsonl", (end, end))
+    created[sid] = start
+full = sorted(created, key=created.get, reverse=True)
+assert [s["sessionId"] for s in cs.iter_sessions(rebuild=True)] == full
+
+# the transcript with the oldest mtime is read last: remove it after the first yield
+path = {f.name[:-6]: f for f in cs.PROJECTS_DIR.glob("*/*.jsonl")}
+last = min(path, key=lambda sid: path[sid].stat().st_mtime)
+sessions = cs.iter_sessions(rebuild=True)
+listed = [next(sessions)["sessionId"]]
+path[last].unlink()
+listed += [s["sessionId"] for s in sessions]
+assert listed == [s for s in full if s != last], (last, listed)
+PY
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
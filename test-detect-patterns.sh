@@ -0,0 +1,183 @@
+#!/usr/bin/env bash
+# Offline smoke test for detect-patterns.py. Scores fixture projects (with a
+# docker stub on PATH) against the results of the original per-check detector,
+# checks the one-pass keyword vocabulary against plain substring tests, and the
+# --dropped window of the score history.
+set -uo pipefail
+
+BIN="$(cd "$(dirname "$0")" && pwd)/detect-patterns.py"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+py()  { python3 - "$BIN" "$@" >"$T/py.out" 2>&1; }   # heredoc snippet, module as `dp`
+
+[ -f "$BIN" ] || { echo "missing $BIN"; exit 1; }
+python3 -c 'import yaml' 2>/dev/null || { echo "PyYAML not installed"; exit 1; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+P="$T/projects" S="$T/secrets"
+mkdir -p "$P/sso" "$P/db" "$P/bare" "$P/docs-only" "$S" "$T/bin"
+
+cat >"$P/sso/docker-compose.yml" <<'EOF'
+services:
+  sso-app:
+    image: ghcr.io/acme/app:1
+    networks: [traefik-net, keycloak-net]
+    labels:
+      logging: promtail
+    healthcheck:
+      test: ["CMD", "true"]
+  oauth2-proxy:
+    image: quay.io/oauth2-proxy/oauth2-proxy
+    networks: [traefik-net, oauth2-net]
+EOF
+cat >"$P/sso/CLAUDE.md" <<'EOF'
+# SSO app
+Served at https://sso.ai-servicers.com behind Keycloak and oauth2-proxy.
+Health endpoint: /healthz. Logs go to Loki; dashboards in Grafana. HSTS on.
+Backups are nightly.
+EOF
+printf 'OIDC_CLIENT_ID=x\nMETRICS_PORT=9100\n' >"$S/sso.env"
+cat >"$P/db/docker-compose.yml" <<'EOF'
+services:
+  db-api:
+    image: node:20
+    networks: [db-net]
+  cache:
+    image: redis:7
+EOF
+cat >"$P/db/CLAUDE.md" <<'EOF'
+# DB API
+Schema changes go through Prisma. Prometheus scrapes /metrics; alerts page on-call.
+EOF
+printf 'POOL_SIZE=10\n' >"$S/db.env"
+touch "$P/db/backup.sh"
+printf 'services:\n  worker:\n    image: python:3.11\n' >"$P/bare/docker-compose.yml"
+printf '# Notes\nLogging via journald. Backup: none yet. Migration plan TBD; the Log is verbose.\n' \
+  >"$P/docs-only/CLAUDE.md"
+# only "sso" has a container: healthy, with Traefik TLS labels
+cat >"$T/bin/docker" <<'EOF'
+#!/bin/sh
+[ "$1" = inspect ] && [ "$2" = sso ] || exit 1
+echo '[{"State": {"Health": {"Status": "healthy"}}, "Config": {"Labels": {"traefik.http.routers.sso.tls.certresolver": "le"}}}]'
+EOF
+chmod +x "$T/bin/docker"
+export PATH="$T/bin:$PATH"
+
+echo "== compiled rules =="
+py "$P" "$S" <<'PY' && ok "fixture projects score as with the per-check detector" \
+  || { no "fixture projects score as with the per-check detector"; cat "$T/py.out"; }
+import contextlib, io, sys
+from pathlib import Path
+from importlib.machinery import SourceFileLoader
+dp = SourceFileLoader("dp", sys.argv[1]).load_module()
+projects, secrets = Path(sys.argv[2]), Path(sys.argv[3])
+
+NO_SSO = ["Not connected to traefik-net (required for external access)",
+          "Not using oauth2-net (consider OAuth2 proxy)", "Not using Keycloak SSO",
+          "No OAuth2/OIDC configuration found"]
+QUIET = (0, [], [])
+# (score, found, missing) per pattern, as reported by the original detector
+expected = {
+    "bare": {
+        "oauth2": (0, [], NO_SSO),
+        "database": QUIET,
+        "monitoring": (0, [], ["No Loki logging labels (recommended for centralized logging)",
+                               "No metrics/Prometheus configuration"]),
+        "ssl_tls": QUIET,
+        "health_check": (0, [], ["No health check in docker-compose.yml (recommended)"]),
+        "backup": (0, [], ["No backup script found"]),
+    },
+    "db": {
+        "oauth2": (0, [], NO_SSO),
+        "database": (5, ["Uses Redis", "Connection pooling configured", "Schema migration documented",
+                         "Database credentials in secrets file"], ["Database backup not documented"]),
+        "monitoring": (2, ["Metrics mentioned in documentation", "Alerting documented"],
+                       ["No Loki logging labels (recommended for centralized logging)",
+                        "No Grafana dashboard mentioned", "Logging strategy not documented"]),
+        "ssl_tls": (0, [], ["No HTTPS endpoint documented"]),
+        "health_check": (0, [], ["No health check in docker-compose.yml (recommended)"]),
+        "backup": (1, ["Backup script present"], ["No backup strategy documented"]),
+    },
+    "docs-only": {
+        "oauth2": QUIET, "database": QUIET, "monitoring": QUIET, "health_check": QUIET,
+        "ssl_tls": (0, [], ["No HTTPS endpoint documented"]),
+        "backup": (2, ["Backup strategy documented"], ["No backup script found"]),
+    },
+    "sso": {
+        "oauth2": (10, ["Connected to traefik-net", "Connected to oauth2-net",
+                        "Connected to keycloak-net (direct OIDC)", "Uses oauth2-proxy for authentication",
+                        "OIDC configuration present", "SSO documented in CLAUDE.md"], []),
+        "database": QUIET,
+        "monitoring": (5, ["Loki logging labels configured", "Metrics configuration found",
+                           "Grafana dashboard documented", "Logging documented"], []),
+        "ssl_tls": (5, ["HTTPS endpoint: sso.ai-servicers.com", "Traefik TLS configuration present",
+                        "Security headers documented"], []),
+        "health_check": (4, ["Health check defined in docker-compose.yml", "Health endpoint documented",
+                             "Container currently healthy"], []),
+        "backup": (2, ["Backup strategy documented"], ["No backup script found"]),
+    },
+}
+for name, want in expected.items():
+    d = dp.PatternDetector(projects / name)
+    d.secrets_file = secrets / f"{name}.env"
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert d.detect_all()
+    got = {k: (p["score"], p["found"], p["missing"]) for k, p in d.patterns.items()}
+    assert got == want, (name, {k: v for k, v in got.items() if v != want[k]})
+    assert {k: p["max"] for k, p in d.patterns.items()} == \
+        {k: r["max"] for k, r in dp.PATTERN_RULES.items()}
+PY
+
+py <<'PY' && ok "vocabulary hits equal per-keyword substring tests" \
+  || { no "vocabulary hits equal per-keyword substring tests"; cat "$T/py.out"; }
+import random, sys
+from importlib.machinery import SourceFileLoader
+dp = SourceFileLoader("dp", sys.argv[1]).load_module()
+rng = random.Random(3)
+for kind, vocab in dp.COMPILED_RULES.vocabulary.items():
+    words = sorted(vocab.keywords) + ["the", " ", "\n", "x", "health", "lo", "ba"]
+    for _ in range(500):
+        text = "".join(rng.choice(words) for _ in range(rng.randrange(12)))
+        want = {kw for kw in vocab.keywords if kw in text}
+        assert vocab.hits(text) == want, (kind, text, vocab.hits(text), want)
+nested = dp.Vocabulary(["log", "logging", "health check", "health", "check"])
+assert nested.hits("health checklogging") == {"log", "logging", "health check", "health", "check"}
+assert dp.Vocabulary([]).hits("anything") == set()
+PY
+
+echo "== score history =="
+py "$T/scores.db" <<'PY' && ok "--dropped window: baseline sample, recoveries, same-second runs" \
+  || { no "--dropped window: baseline sample, recoveries, same-second runs"; cat "$T/py.out"; }
+import sys
+from importlib.machinery import SourceFileLoader
+dp = SourceFileLoader("dp", sys.argv[1]).load_module()
+store = dp.ScoreStore(sys.argv[2])
+
+def run(ts, **scores):  # monitoring scores out of 6
+    store.record({p: {"monitoring": {"score": s, "max": 6, "missing": []}}
+                  for p, s in scores.items()}, ts=ts)
+
+since = "2026-10-01T00:00:00+00:00"
+run("2026-09-01T00:00:00+00:00", stale=6)
+run("2026-09-20T00:00:00+00:00", regressed=6, low=1, recovered=6, stale=1)
+run("2026-10-05T00:00:00+00:00", regressed=2, low=2, recovered=1)
+run("2026-10-06T00:00:00+00:00", recovered=5, entered=6)
+run("2026-10-07T00:00:00+00:00", entered=0)
+# two runs within one second: the later insert is the latest sample
+run("2026-10-08T12:00:00+00:00", tie_down=6, tie_up=0)
+run("2026-10-08T12:00:00+00:00", tie_down=0, tie_up=6)
+rows = store.dropped("monitoring", 50, since)
+got = [(p, round(peak), round(latest), ts[:10]) for p, peak, latest, ts in rows]
+assert got == [("entered", 100, 0, "2026-10-07"), ("tie_down", 100, 0, "2026-10-08"),
+               ("regressed", 100, 33, "2026-10-05")], got
+assert store.dropped("monitoring", 50, "2026-10-08T00:00:00+00:00") == [
+    ("tie_down", 100.0, 0.0, "2026-10-08T12:00:00+00:00")]
+assert store.dropped("backup", 50, since) == []
+hist = store.history("tie_up")
+assert [r[2] for r in hist] == [0, 6], hist
+PY
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
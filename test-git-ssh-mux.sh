@@ -0,0 +1,103 @@
+#!/usr/bin/env bash
+# Smoke test for SSH connection sharing in `gitpull all` / `gitpush all`.
+# Run from anywhere. A fake `ssh` on PATH logs every invocation and runs the
+# remote git command locally, so ssh:// and scp-style remotes resolve to bare
+# repos on disk. Checks one master per host, every git op on the shared
+# ControlPath, masters closed afterwards, the ls-remote fetch skip, and that a
+# repo's own core.sshCommand is left in charge of its connections.
+set -uo pipefail
+
+DIR="$(cd "$(dirname "$0")" && pwd)"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+has() { grep -q -- "$1" "$2" && ok "$3" || no "$3"; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+export HOME="$T/home" TMPDIR="$T/tmp" LOG="$T/ssh.log" PATH="$T/bin:$PATH"
+export GIT_AUTHOR_NAME=t GIT_AUTHOR_EMAIL=t@t GIT_COMMITTER_NAME=t GIT_COMMITTER_EMAIL=t@t
+unset GIT_SSH GIT_SSH_COMMAND
+mkdir -p "$HOME/projects" "$T/remotes" "$T/work" "$T/bin" "$TMPDIR"
+
+cat >"$T/bin/ssh" <<'EOF'
+#!/usr/bin/env bash
+echo "$*" >>"$LOG"
+master=false op=""
+while [[ $# -gt 0 ]]; do
+  case "$1" in
+    -o) [[ "$2" == ControlMaster=yes ]] && master=true; shift 2 ;;
+    -O) op="$2"; shift 2 ;;
+    -p) shift 2 ;;
+    -*) shift ;;
+    *) break ;;
+  esac
+done
+shift   # destination
+[[ -n "$op" || "$master" == true ]] && exit 0
+exec sh -c "$*"
+EOF
+chmod +x "$T/bin/ssh"
+
+# make_repo <name> <origin url>: bare remote, a clone tracking <url>, one new upstream commit
+make_repo() {
+  git init -q --bare -b main "$T/remotes/$1.git"
+  git clone -q "$T/remotes/$1.git" "$T/work/$1" 2>/dev/null
+  (cd "$T/work/$1" && echo one > f && git add f && git commit -qm one && git push -q origin main)
+  git clone -q "$T/remotes/$1.git" "$HOME/projects/$1"
+  git -C "$HOME/projects/$1" remote set-url origin "$2"
+  git -C "$HOME/projects/$1" fetch -q origin 2>/dev/null
+  (cd "$T/work/$1" && echo two >> f && git commit -qam two && git push -q origin main)
+}
+make_repo a "ssh://git@hosta:2222$T/remotes/a.git"
+make_repo b "ssh://git@hosta:2222$T/remotes/b.git"
+make_repo c "git@hostb:$T/remotes/c.git"
+make_repo d "git@hostb:$T/remotes/d.git"
+git -C "$HOME/projects/d" pull -q origin main 2>/dev/null          # d already current
+make_repo e "git@hostc:$T/remotes/e.git"
+git -C "$HOME/projects/e" config core.sshCommand "ssh -o Custom=repo"   # per-repo key
+: >"$LOG"
+
+echo "== gitpull all =="
+out="$T/pull"; "$DIR/gitpull" all >"$out" 2>&1
+[ "$(grep -c 'ControlMaster=yes' "$LOG")" -eq 2 ]        && ok "one master per host"             || no "one master per host"
+grep -q -- '-p 2222 git@hosta' "$LOG"                     && ok "ssh:// port passed to master"    || no "ssh:// port passed to master"
+ops="$(grep -v -e 'ControlMaster=yes' -e '-O exit' -e 'Custom=repo' "$LOG")"
+[ -n "$ops" ] && ! grep -qv 'ControlPath=' <<<"$ops"      && ok "every git op on the ControlPath" || no "every git op on the ControlPath"
+grep -q 'Custom=repo' "$LOG" && [ "$(grep 'Custom=repo' "$LOG" | grep -c ControlPath)" -eq 0 ] && ! grep -q hostc.*ControlMaster=yes "$LOG" \
+  && ok "repo core.sshCommand kept, no master for it" || no "repo core.sshCommand kept, no master for it"
+[ "$(grep -c -- '-O exit' "$LOG")" -eq 2 ]                && ok "masters closed at exit"          || no "masters closed at exit"
+[ -z "$(ls -A "$TMPDIR")" ]                               && ok "temp dirs removed"               || no "temp dirs removed"
+for r in a b c e; do
+  [ "$(git -C "$HOME/projects/$r" log -1 --format=%s)" = two ] || no "$r pulled over fake ssh"
+done && ok "changed repos pulled over ssh"
+has "Sharing SSH connections to" "$out" "run announces shared connections"
+[ "$(grep -c 'skipping fetch' "$out")" -eq 1 ] && grep -q "gitpull for 'd'" "$out" \
+  && ok "only the up-to-date repo skips its fetch" || no "only the up-to-date repo skips its fetch"
+
+echo "== gitpush all =="
+echo local >>"$HOME/projects/a/f"
+git -C "$HOME/projects/b" reset -q --hard HEAD~1                  # behind a fetched origin/main
+echo new >"$HOME/projects/b/g"
+: >"$LOG"
+out="$T/push"; "$DIR/gitpush" all "Weekly updates" >"$out" 2>&1
+[ "$(git --git-dir="$T/remotes/a.git" log -1 --format=%s main)" = "Weekly updates" ] \
+  && ok "local change pushed over shared connection" || no "local change pushed over shared connection"
+[ "$(grep -c 'ControlMaster=yes' "$LOG")" -eq 2 ]        && ok "one master per host"             || no "one master per host"
+ops="$(grep -v -e 'ControlMaster=yes' -e '-O exit' -e 'Custom=repo' "$LOG")"
+[ -n "$ops" ] && ! grep -qv 'ControlPath=' <<<"$ops"      && ok "every git op on the ControlPath" || no "every git op on the ControlPath"
+[ "$(grep -c 'skipping fetch' "$out")" -eq 5 ]          && ok "unchanged origins skip their fetch" || no "unchanged origins skip their fetch"
+[ "$(git --git-dir="$T/remotes/b.git" log -1 --format=%s main)" = "Weekly updates" ] \
+  && [ "$(git --git-dir="$T/remotes/b.git" log --format=%s main | grep -cx two)" -eq 1 ] \
+  && ok "branch behind origin/main still pulled before pushing" || no "branch behind origin/main still pulled before pushing"
+[ "$(grep -c 'nothing to push' "$out")" -eq 3 ]         && ok "clean, in-sync repos answered by the state scan" || no "clean, in-sync repos answered by the state scan"
+[ "$(grep -c -- '-O exit' "$LOG")" -eq 2 ]                && ok "masters closed at exit"          || no "masters closed at exit"
+
+echo "== caller's GIT_SSH_COMMAND wins =="
+: >"$LOG"
+GIT_SSH_COMMAND="ssh -o Custom=1" "$DIR/gitpull" all >/dev/null 2>&1
+! grep -q 'ControlMaster' "$LOG" && grep -q 'Custom=1' "$LOG" \
+  && ok "no multiplexing layered on a custom ssh command" || no "no multiplexing layered on a custom ssh command"
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
@@ -0,0 +1,398 @@
+#!/usr/bin/env bash
+# Offline smoke test for gitlab-status. Runs the CLI against a local stub GitLab
+# (python http.server, fixture data generated below) so the HTTP client can be
+# exercised without a live instance. Complements test-gitlab-status.sh.
+set -uo pipefail
+
+CLI="$(cd "$(dirname "$0")" && pwd)/gitlab-status"
+PASS=0 FAIL=0
+TMP="$(mktemp -d)"
+LISTENER_PID=""
+trap 'kill "$STUB_PID" $LISTENER_PID 2>/dev/null; rm -rf "$TMP"' EXIT
+
+check() {  # check <description> <test-command...>
+  local desc="$1"; shift
+  if "$@" >/dev/null 2>&1; then
+    echo "  PASS  $desc"; PASS=$((PASS + 1))
+  else
+    echo "  FAIL  $desc"; FAIL=$((FAIL + 1))
+  fi
+}
+
+cat >"$TMP/stub.py" <<'PY'
+import hashlib, json, sys, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TOKEN = "stub-token"
+NPROJ = 30
+PROJECTS = [{"id": i, "path": f"p{i}", "path_with_namespace": f"team/p{i}",
+             "web_url": f"http://stub/team/p{i}",
+             "last_activity_at": f"2026-10-{1 + i % 18:02d}T10:00:00+00:00"}
+            for i in range(1, NPROJ + 1)]
+# every third project is idle; the rest carry 150 open cards over two
+# enhancements, except team/p2 with 1234 (13 pages of 100)
+ISSUES = {p["id"]: [] if p["id"] % 3 == 0 else [
+    {"iid": n, "title": f"TASK: Execute step {n}", "state": "opened",
+     "web_url": f"http://stub/team/p{p['id']}/-/issues/{n}",
+     "updated_at": f"2026-10-{1 + n % 18:02d}T10:{n % 60:02d}:{n // 60:02d}+00:00",
+     "labels": [f"enhancement::e{n % 2}",
+                "decision-needed" if n % 7 == 0 else "in-progress"]}
+    for n in range(1, 1235 if p["id"] == 2 else 151)] for p in PROJECTS}
+stats = {"requests": 0, "connections": 0, "not_modified": 0, "issue_rows": 0,
+         "graphql": 0, "injected": 0}
+THROTTLE = {"every": 0, "status": 429}
+THROTTLED = {}  # request -> times throttled; a retried request is hit at most twice
+lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    wbufsize = 1 << 16  # one write per response (no Nagle / delayed-ACK stalls)
+
+    def setup(self):
+        super().setup()
+        with lock:
+            stats["connections"] += 1
+
+    def log_message(self, *a):
+        pass
+
+    def send(self, code, obj, headers=None):
+        body = json.dumps(obj).encode()
+        etag = 'W/"%s"' % hashlib.sha1(body).hexdigest()
+        if code == 200 and self.headers.get("If-None-Match") == etag:
+            with lock:
+                stats["not_modified"] += 1
+            code, body = 304, b""
+        self.send_response(code)
+        if code in (200, 304):
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def throttled(self, key):
+        """Answer every THROTTLE['every']-th API request with THROTTLE['status']."""
+        with lock:
+            hit = THROTTLE["every"] and stats["requests"] % THROTTLE["every"] == 0 \
+                and THROTTLED.get(key, 0) < 2
+            if hit:
+                THROTTLED[key] = THROTTLED.get(key, 0) + 1
+            stats["injected"] += bool(hit)
+        if hit:
+            self.send(THROTTLE["status"], {"message": "slow down"},
+                      {"Retry-After": "0"} if THROTTLE["status"] == 429 else None)
+        return hit
+
+    def page(self, items, q):
+        per = int(q.get("per_page", ["20"])[0])
+        page = int(q.get("page", ["1"])[0])
+        total_pages = max(1, -(-len(items) // per))
+        self.send(200, items[(page - 1) * per: page * per],
+                  {"X-Total": str(len(items)), "X-Total-Pages": str(total_pages),
+                   "X-Page": str(page), "X-Per-Page": str(per)})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        q = parse_qs(url.query)
+        parts = url.path.split("/")[3:]  # after /api/v4
+        if url.path.startswith("/__"):
+            parts = url.path.split("/")[1:]
+        if url.path == "/__stats":
+            return self.send(200, stats)
+        if parts[:1] == ["__throttle"]:
+            THROTTLE.update(every=int(parts[1]), status=int(parts[2]))
+            THROTTLED.clear()
+            return self.send(200, THROTTLE)
+        if parts[:1] == ["__newproject"]:
+            pid = len(PROJECTS) + 1
+            PROJECTS.append({"id": pid, "path": f"p{pid}", "path_with_namespace": f"team/p{pid}",
+                             "web_url": f"http://stub/team/p{pid}",
+                             "last_activity_at": "2026-10-19T10:00:00+00:00"})
+            ISSUES[pid] = []
+            return self.send(200, PROJECTS[-1])
+        if parts[:1] == ["__close"] or parts[:1] == ["__unlabel"]:
+            iss = ISSUES[int(parts[1])][int(parts[2]) - 1]
+            if parts[0] == "__close":
+                iss["state"] = "closed"
+            else:
+                iss["labels"] = [l for l in iss["labels"] if not l.startswith("enhancement::")]
+            iss["updated_at"] = "2026-10-19T12:00:00+00:00"
+            return self.send(200, iss)
+        with lock:
+            stats["requests"] += 1
+        if self.throttled(self.path):
+            return
+        if self.headers.get("PRIVATE-TOKEN") != TOKEN:
+            return self.send(401, {"message": "401 Unauthorized"})
+        if parts == ["projects"]:
+            return self.page(PROJECTS, q)
+        if len(parts) >= 2 and parts[0] == "projects":
+            pid = int(parts[1]) if parts[1].isdigit() else next(
+                (p["id"] for p in PROJECTS
+                 if p["path_with_namespace"] == parts[1].replace("%2F", "/")), 0)
+            if pid not in ISSUES:
+                return self.send(404, {"message": "404 Project Not Found"})
+            if len(parts) == 2:
+                return self.send(200, PROJECTS[pid - 1])
+            if parts[2] == "labels":
+                names = sorted({l for i in ISSUES[pid] for l in i["labels"]})
+                term = q.get("search", [""])[0]
+                return self.page([{"name": n} for n in names if term in n], q)
+            if parts[2] == "issues":
+                items = ISSUES[pid]
+                state = q.get("state", ["all"])[0]
+                if state != "all":
+                    items = [i for i in items if i["state"] == state]
+                for label in q.get("labels", [""])[0].split(","):
+                    items = [i for i in items if not label or label in i["labels"]]
+                after = q.get("updated_after", [""])[0]
+                items = [i for i in items if not after or i["updated_at"] >= after]
+                with lock:
+                    stats["issue_rows"] += len(items)
+                return self.page(items, q)
+            if parts[2:] == ["repository", "commits"]:
+                return self.send(200, [{"committed_date": "2026-09-01T10:00:00+00:00"}])
+        self.send(404, {"message": "404 Not Found"})
+
+    def do_POST(self):
+        # GraphQL, answered from the query variables alone (p<i> = project path,
+        # s<i> state, u<i> updatedAfter, a<i> cursor, c<i> include last commit)
+        req = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with lock:
+            stats["requests"] += 1
+            stats["graphql"] += 1
+        if self.throttled(json.dumps(req, sort_keys=True)):
+            return
+        if self.headers.get("Authorization") != f"Bearer {TOKEN}":
+            return self.send(401, {"message": "401 Unauthorized"})
+        v, data, i = req["variables"], {}, 0
+        while f"p{i}" in v:
+            proj = next((p for p in PROJECTS if p["path_with_namespace"] == v[f"p{i}"]), None)
+            if proj is None:
+                data[f"p{i}"] = None
+                i += 1
+                continue
+            items = [x for x in ISSUES[proj["id"]]
+                     if v[f"s{i}"] == "all" or x["state"] == v[f"s{i}"]]
+            items = [x for x in items if not v[f"u{i}"] or x["updated_at"] >= v[f"u{i}"]]
+            items.sort(key=lambda x: x["updated_at"], reverse=True)
+            start = int(v[f"a{i}"] or 0)
+            page = items[start:start + 100]
+            with lock:
+                stats["issue_rows"] += len(page)
+            node = {"id": f"gid://gitlab/Project/{proj['id']}", "issues": {
+                "pageInfo": {"hasNextPage": start + 100 < len(items),
+                             "endCursor": str(start + 100)},
+                "nodes": [{"iid": str(x["iid"]), "title": x["title"], "state": x["state"],
+                           "webUrl": x["web_url"], "updatedAt": x["updated_at"],
+                           "labels": {"nodes": [{"title": l} for l in x["labels"]]}}
+                          for x in page]}}
+            if v[f"c{i}"]:
+                node["repository"] = {"tree": {"lastCommit": {
+                    "committedDate": "2026-09-01T10:00:00+00:00"}}}
+            data[f"p{i}"] = node
+            i += 1
+        self.send(200, {"data": data})
+
+
+ThreadingHTTPServer.request_queue_size = 64
+srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+print(srv.server_address[1], flush=True)
+srv.serve_forever()
+PY
+
+python3 "$TMP/stub.py" >"$TMP/port" &
+STUB_PID=$!
+for _ in $(seq 50); do [ -s "$TMP/port" ] && break; sleep 0.1; done
+PORT="$(cat "$TMP/port")"
+stats() { python3 -c "import json,urllib.request; print(json.load(urllib.request.urlopen('http://127.0.0.1:$PORT/__stats'))['$1'])"; }
+
+export GITLAB_HOST="http://127.0.0.1:$PORT" GLAB_CONFIG_DIR="$TMP/glab" XDG_CACHE_HOME="$TMP/cache"
+unset GITLAB_TOKEN GITLAB_ACCESS_TOKEN OAUTH_TOKEN
+mkdir -p "$GLAB_CONFIG_DIR"
+cat >"$GLAB_CONFIG_DIR/config.yml" <<YML
+git_protocol: ssh
+hosts:
+    127.0.0.1:$PORT:
+        token: stub-token
+        api_protocol: http
+host: 127.0.0.1:$PORT
+YML
+
+echo "gitlab-status offline smoke test (stub GitLab on :$PORT)"
+echo "=================================================="
+
+# 1. token comes from glab's config.yml; --all covers every stub project
+out_json="$("$CLI" --all --json 2>"$TMP/err")"
+check "--all --json lists all 30 projects"   test "$(jq 'length' <<<"$out_json")" -eq 30
+check "active project has both enhancements" jq -e '."team/p1".enhancements | length == 2' <<<"$out_json"
+check "idle project flagged idle"            jq -e '."team/p3".idle' <<<"$out_json"
+python3 - "$CLI" <<'ORDER' && check "--json lists enhancements in view order" true \
+  || check "--json lists enhancements in view order" false
+import json, sys
+from importlib.machinery import SourceFileLoader
+gs = SourceFileLoader("gitlab_status", sys.argv[1]).load_module()
+card = lambda iid, enh, state, day: {
+    "iid": iid, "title": f"TASK: {iid}", "state": "opened", "web_url": f"u/{iid}",
+    "updated_at": f"2026-10-{day:02d}T10:00:00+00:00", "labels": [f"enhancement::{enh}", state]}
+# newest first would be b, c, a; state priority then activity gives c, a, b
+p = gs.build_project({"path_with_namespace": "t/x", "id": 9},
+                     [card(1, "a", "in-progress", 2), card(2, "b", "decision-needed", 19),
+                      card(3, "c", "in-progress", 10)])
+view = [ln.strip() for ln in gs.render_single(p, gs.Painter(False), None).splitlines()
+        if ln.startswith("  ") and not ln.startswith("    ")]
+keys = list(json.loads(gs.to_json([p], {}))["t/x"]["enhancements"])
+assert view == keys and [k[-1] for k in keys] == ["c", "a", "b"], (view, keys)
+ORDER
+check "issue store is per API host"          test -f "$XDG_CACHE_HOME/gitlab-status/issues-127.0.0.1_$PORT.db"
+
+# 2. cards came from a couple of batched GraphQL queries, matching REST exactly
+# (one round per page of the largest project: team/p2 has 13)
+check "--all used batched GraphQL ($(stats graphql) queries)" test "$(stats graphql)" -le 14
+rest_json="$(XDG_CACHE_HOME="$TMP/rest-cache" "$CLI" --all --json --rest 2>/dev/null)"
+check "GraphQL and REST agree"               test "$rest_json" = "$out_json"
+
+# 2b. REST pagination reads every page of a large project, concurrently
+"$CLI" team/p2 --json --rest --no-cache --api-stats >"$TMP/p2" 2>"$TMP/err"
+check "all 1234 cards of a 13-page project"  jq -e '[."team/p2".enhancements[].card_count] | add == 1234' "$TMP/p2"
+check "--api-stats lists the issues endpoint" grep -q "GET /api/v4/projects/:id/issues" "$TMP/err"
+check "no truncation warning"                bash -c "! grep -q truncated '$TMP/err'"
+
+# 2c. injected 429s and 503s are retried with backoff; the run still succeeds
+stub() { python3 -c "import urllib.request; urllib.request.urlopen('http://127.0.0.1:$PORT/$1')"; }
+stub __throttle/3/429
+XDG_CACHE_HOME="$TMP/throttle" "$CLI" --all --json --rest --api-stats >"$TMP/throttled" 2>"$TMP/err"
+check "429 every 3rd request: run succeeds"  test "$(cat "$TMP/throttled")" = "$rest_json"
+check "scheduler reports retries"            grep -Eq "[1-9][0-9]* throttled \(429\)" "$TMP/err"
+stub __throttle/5/503
+XDG_CACHE_HOME="$TMP/throttle2" "$CLI" --all --json >"$TMP/throttled" 2>"$TMP/err"
+check "503 every 5th request: run succeeds"  test "$(cat "$TMP/throttled")" = "$out_json"
+stub __throttle/0/429
+
+# 2d. keep-alive: far fewer connections than requests
+check "connections pooled ($(stats connections) conns / $(stats requests) reqs)" \
+  test "$(stats connections)" -lt "$(stats requests)"
+
+# 3. once synced, REST revalidates with ETags: the stub answers 304 without bodies
+"$CLI" --all --json >"$TMP/second" 2>/dev/null
+check "second run identical"                 diff -q <(echo "$out_json") "$TMP/second"
+"$CLI" --all --rest >/dev/null 2>&1
+check "lifetime totals kept without --cache-stats" \
+  jq -e '.requests > 0' "$XDG_CACHE_HOME/gitlab-status/stats.json"
+check "cache and issue store dirs are 0700"  test -z "$(find "$XDG_CACHE_HOME/gitlab-status" -type d -perm /077)"
+mkdir -p -m 755 "$TMP/old-cache/gitlab-status"
+XDG_CACHE_HOME="$TMP/old-cache" "$CLI" team/p1 --rest >/dev/null 2>&1
+check "a 0755 dir from older runs is tightened" test "$(stat -c %a "$TMP/old-cache/gitlab-status")" = 700
+before="$(stats not_modified)"
+"$CLI" --all --rest --cache-stats >/dev/null 2>"$TMP/err"
+check "unchanged pages come back 304"        test "$(( $(stats not_modified) - before ))" -ge 30
+check "--cache-stats reports a hit rate"     grep -q "hit rate 100%" "$TMP/err"
+
+# 4. incremental sync: closing or unlabelling a card costs only the changed rows
+stub __close/1/7; stub __unlabel/1/8
+before="$(stats issue_rows)"
+"$CLI" team/p1 --json >"$TMP/p1" 2>"$TMP/err"
+check "closed + unlabelled cards dropped"    jq -e '[."team/p1".enhancements[].card_count] | add == 148' "$TMP/p1"
+# (+1: updated_after is inclusive, so the watermark issue is read again)
+check "sync fetched only changed issues"     test "$(( $(stats issue_rows) - before ))" -le 3
+
+# 5. a rejected token exits 2 with an auth hint, not a traceback
+GITLAB_TOKEN=wrong "$CLI" --all >/dev/null 2>"$TMP/err"; rc=$?
+check "bad token exits 2"                    test "$rc" -eq 2
+check "bad token explains itself"            grep -q "401" "$TMP/err"
+
+# 6. webhook listener: replayed issue/push events update the store with no API calls
+GITLAB_WEBHOOK_SECRET= timeout 5 "$CLI" --listen 0.0.0.0:0 >/dev/null 2>"$TMP/err"
+check "no secret off loopback: refused"      test $? -eq 2
+LPORT="$(python3 -c "import socket; s=socket.socket(); s.bind(('127.0.0.1', 0)); print(s.getsockname()[1])")"
+GITLAB_WEBHOOK_SECRET=s3cret "$CLI" --listen "127.0.0.1:$LPORT" 2>"$TMP/listener.log" &
+LISTENER_PID=$!
+for _ in $(seq 50); do grep -q listening "$TMP/listener.log" 2>/dev/null && break; sleep 0.1; done
+"$CLI" --all --json >/dev/null 2>&1   # sync every project under the running listener
+hook() { curl -s -o /dev/null -w "%{http_code}" -H "X-Gitlab-Token: $2" \
+           -H "Content-Type: application/json" --data @"$1" "http://127.0.0.1:$LPORT/"; }
+cat >"$TMP/issue-hook.json" <<'JSON'
+{"object_kind": "issue", "event_type": "issue",
+ "project": {"id": 1, "path_with_namespace": "team/p1", "web_url": "http://stub/team/p1"},
+ "object_attributes": {"iid": 11, "title": "TASK: Execute step 11", "state": "closed",
+   "action": "close", "url": "http://stub/team/p1/-/issues/11",
+   "updated_at": "2026-10-19 13:00:00 UTC"},
+ "labels": [{"title": "enhancement::e1"}, {"title": "in-progress"}]}
+JSON
+cat >"$TMP/push-hook.json" <<'JSON'
+{"object_kind": "push", "project_id": 3,
+ "project": {"id": 3, "path_with_namespace": "team/p3", "web_url": "http://stub/team/p3"},
+ "commits": [{"id": "a1", "timestamp": "2026-10-19T09:00:00+00:00"},
+             {"id": "b2", "timestamp": "2026-10-19T11:30:00+00:00"}]}
+JSON
+stub __close/1/11                      # GitLab's side of the change the hook reports
+check "webhook with a bad secret is refused" test "$(hook "$TMP/issue-hook.json" nope)" = 401
+check "issue hook accepted"                  test "$(hook "$TMP/issue-hook.json" s3cret)" = 200
+check "push hook accepted"                   test "$(hook "$TMP/push-hook.json" s3cret)" = 200
+"$CLI" --all --json >"$TMP/hooked" 2>"$TMP/err"
+check "closed card gone from the listing"    jq -e '[."team/p1".enhancements[].card_count] | add == 147' "$TMP/hooked"
+check "push moved the idle row's last commit" jq -e '."team/p3".last_commit | startswith("2026-10-19T11:30")' "$TMP/hooked"
+before="$(stats requests)"
+"$CLI" team/p1 --json >/dev/null 2>&1
+check "hooked project made no API calls"     test "$(stats requests)" -eq "$before"
+# a project whose hooks never arrive is not trusted to the listener
+stub __close/4/5
+"$CLI" team/p4 --json >"$TMP/unhooked" 2>/dev/null
+check "unhooked project still synced"        jq -e '[."team/p4".enhancements[].card_count] | add == 149' "$TMP/unhooked"
+# a delivery lost for a hooked project is caught by the periodic full resync
+stub __close/1/12
+age() { python3 - "$XDG_CACHE_HOME/gitlab-status/issues-127.0.0.1_$PORT.db" "$1" <<'AGE'
+import sqlite3, sys
+db = sqlite3.connect(sys.argv[1])
+db.execute(sys.argv[2])
+db.commit()
+AGE
+}
+age "UPDATE sync SET full_at = 0 WHERE project_id = 1"
+before="$(stats requests)"
+"$CLI" team/p1 --json >"$TMP/resynced" 2>/dev/null
+check "due full resync runs while listening" test "$(stats requests)" -gt "$before"
+check "full resync drops the missed card"    jq -e '[."team/p1".enhancements[].card_count] | add == 146' "$TMP/resynced"
+# the project list and pushed commit dates are re-read on the same cadence
+stub __newproject
+age "UPDATE project_list SET fetched_at = 0"
+age "UPDATE commits SET checked_at = 0 WHERE project_id = 3"
+"$CLI" --all --json >"$TMP/refreshed" 2>/dev/null
+check "project list re-read while listening" jq -e 'has("team/p31")' "$TMP/refreshed"
+check "stale last commit re-read from GitLab" jq -e '."team/p3".last_commit | startswith("2026-09-01")' "$TMP/refreshed"
+# a sync fetched before a webhook event must not overwrite the event's newer row
+python3 - "$CLI" "$TMP/race.db" <<'RACE' && check "older sync keeps the webhook's newer card" true \
+  || check "older sync keeps the webhook's newer card" false
+import sys
+from importlib.machinery import SourceFileLoader
+gs = SourceFileLoader("gitlab_status", sys.argv[1]).load_module()
+store = gs.IssueStore(sys.argv[2])
+card = {"iid": 5, "state": "opened", "labels": ["enhancement::e1"], "web_url": "u"}
+store.apply(1, [dict(card, title="old", updated_at="2026-10-19T12:00:00+00:00")], None, full=True)
+store.apply_event(1, dict(card, title="hooked", updated_at="2026-10-19T13:00:00.000Z"))
+store.apply(1, [dict(card, title="stale", updated_at="2026-10-19T12:30:00+00:00")], None)
+assert [c["title"] for c in store.cards(1)] == ["hooked"], store.cards(1)
+store.apply(1, [dict(card, title="stale", state="closed", updated_at="2026-10-19T12:30:00Z")], None)
+assert [c["title"] for c in store.cards(1)] == ["hooked"], store.cards(1)
+store.apply(1, [dict(card, title="newer", updated_at="2026-10-19T14:00:00+00:00")], None)
+assert [c["title"] for c in store.cards(1)] == ["newer"], store.cards(1)
+RACE
+kill "$LISTENER_PID"; wait "$LISTENER_PID" 2>/dev/null; LISTENER_PID=""
+
+# 7. with GitLab unreachable the cached responses are served, with a warning
+"$CLI" --all --json >"$TMP/online" 2>/dev/null
+kill "$STUB_PID"; wait "$STUB_PID" 2>/dev/null
+"$CLI" --all --json >"$TMP/offline" 2>"$TMP/err"
+check "offline run served from cache"        diff -q "$TMP/online" "$TMP/offline"
+check "offline run warns"                    grep -q "serving cached" "$TMP/err"
+"$CLI" --all --no-cache >/dev/null 2>&1
+check "--no-cache fails when offline"        test $? -ne 0
+
+echo "=================================================="
+echo "  $PASS passed, $FAIL failed"
+exit $(( FAIL > 0 ? 1 : 0 ))
@@ -1,7 +1,7 @@
 #!/usr/bin/env bash
 # Integration smoke test for gitlab-status. Runs each mode against the LIVE GitLab
-# (mocking glab is more trouble than it's worth for a tool this thin) and asserts
-# the load-bearing behaviours from SPEC.md §6. Requires glab to be authenticated.
+# and asserts the load-bearing behaviours from SPEC.md §6. Requires a GitLab token
+# (glab's config.yml or $GITLAB_TOKEN). test-gitlab-status-stub.sh is the offline twin.
 set -uo pipefail
 
 CLI="$(dirname "$0")/gitlab-status"
@@ -0,0 +1,104 @@
+#!/usr/bin/env bash
+# Smoke test for `gitpull all` against local bare repositories. Run from anywhere.
+# Builds a throwaway $HOME/projects whose repos track file:// remotes, pushes
+# new commits upstream, then checks the parallel run updates clean repos and
+# still reports dirty, .nogit and unreachable ones like the sequential path.
+# Also checks the gitstate scan the bulk run consults before fetching.
+set -uo pipefail
+
+BIN="$(cd "$(dirname "$0")" && pwd)/gitpull"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+has() { grep -q "$1" "$2" && ok "$3" || no "$3"; }
+
+[ -x "$BIN" ] || { echo "missing $BIN"; exit 1; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+export HOME="$T/home" GIT_AUTHOR_NAME=t GIT_AUTHOR_EMAIL=t@t GIT_COMMITTER_NAME=t GIT_COMMITTER_EMAIL=t@t
+mkdir -p "$HOME/projects/grp" "$T/remotes" "$T/work"
+echo "b" > "$HOME/projects/grp/.gitgroup"
+
+# make_repo <name> <checkout path>: bare remote + a clone under projects/
+make_repo() {
+  git init -q --bare -b main "$T/remotes/$1.git"
+  git clone -q "$T/remotes/$1.git" "$T/work/$1" 2>/dev/null
+  (cd "$T/work/$1" && echo one > f && git add f && git commit -qm one && git push -q origin main)
+  git clone -q "$T/remotes/$1.git" "$2"
+  (cd "$T/work/$1" && echo two >> f && git commit -qam two && git push -q origin main)
+}
+for r in a c d e; do make_repo "$r" "$HOME/projects/$r"; done
+make_repo b "$HOME/projects/grp/b"
+make_repo nope "$HOME/projects/nope"
+echo dirty >> "$HOME/projects/c/f"                              # dirty guard
+touch "$HOME/projects/d/.nogit"                                 # excluded
+git -C "$HOME/projects/nope" remote set-url origin "$T/remotes/missing.git"
+for r in a e grp/b; do                                           # ~1s round-trip each
+  git -C "$HOME/projects/$r" config remote.origin.uploadpack "sleep 1; git-upload-pack"
+done
+secs() { sed -n "s/^$1: \([0-9]*\)\.\([0-9]*\)s.*/\1\2/p" "$2"; }  # -> centiseconds
+
+echo "== gitpull -j 4 all =="
+out="$T/out"; "$BIN" -j 4 all >"$out" 2>&1; rc=$?
+[ "$rc" -eq 1 ]                                                  && ok "exit 1 with dirty/failed repos" || no "exit 1 with dirty/failed repos (got $rc)"
+[ "$(git -C "$HOME/projects/a" log -1 --format=%s)" = two ]      && ok "clean repo fast-forwarded"      || no "clean repo fast-forwarded"
+[ "$(git -C "$HOME/projects/grp/b" log -1 --format=%s)" = two ]  && ok ".gitgroup child pulled"         || no ".gitgroup child pulled"
+grep -q dirty "$HOME/projects/c/f"                               && ok "dirty repo left untouched"      || no "dirty repo left untouched"
+[ "$(git -C "$HOME/projects/d" log -1 --format=%s)" = one ]      && ok ".nogit repo not pulled"         || no ".nogit repo not pulled"
+has "Successful: 3 projects"   "$out" "summary counts a, e, grp/b"
+has "Dirty — skipped: 1"       "$out" "summary lists the dirty repo"
+has "Skipped: 1 projects"      "$out" "summary lists the .nogit repo"
+has "nope .*credentials required" "$out" "unreadable remote reported under Auth Required"
+has "REFUSING to reset"        "$out" "dirty-guard prompt block printed"
+has "with 4 worker(s)"         "$out" "timings report the worker count"
+has "Slowest repos:"           "$out" "timings list the slowest repos"
+[ "$(secs "Wall time" "$out")" -lt 250 ] && [ "$(secs "Sum of per-repo time" "$out")" -ge 300 ] \
+  && ok "slow fetches overlap (wall < sum)" || no "slow fetches overlap (wall < sum)"
+order="$(grep '📍 Processing:' "$out" | sed 's|.*/projects/||' | tr -d '\n')"
+[ "$order" = "a/c/e/grp/b/nope/" ]                               && ok "blocks printed in repo order"   || no "blocks printed in repo order ($order)"
+
+echo "== gitpull -j 1 all matches =="
+for r in a e b; do (cd "$T/work/$r" && echo three >> f && git commit -qam three && git push -q origin main); done
+out1="$T/out1"; "$BIN" -j 1 all >"$out1" 2>&1
+diff <(grep -E '^(✅|❌|🔐|🔒|⏭️)' "$out") <(grep -E '^(✅|❌|🔐|🔒|⏭️)' "$out1") >/dev/null \
+  && ok "sequential run gives the same summary" || no "sequential run gives the same summary"
+has "with 1 worker(s)"         "$out1" "-j 1 reported"
+[ "$(secs "Wall time" "$out1")" -ge 300 ]                       && ok "-j 1 runs one repo at a time" || no "-j 1 runs one repo at a time"
+
+
+echo "== nothing new upstream =="
+out2="$T/out2"; "$BIN" all >"$out2" 2>&1
+[ "$(grep -c 'unchanged (ls-remote); skipping fetch' "$out2")" -eq 3 ] \
+  && ok "unchanged origins (a, e, grp/b) skip their fetch" || no "unchanged origins (a, e, grp/b) skip their fetch"
+[ "$(git -C "$HOME/projects/a" log -1 --format=%s)" = three ]    && ok "earlier fetch still applied"    || no "earlier fetch still applied"
+has "Scanned 5 repos: 1 dirty"  "$out2" "one state scan covers the work list"
+awk '/📍 Processing: .*\/c\/$/ {on=1; next} /📍 Processing:/ {on=0} on' "$out2" >"$T/c_block"
+has "REFUSING to reset"         "$T/c_block" "dirty repo refused from the scan"
+grep -q "Fetching latest" "$T/c_block" && no "dirty repo refused without a fetch" || ok "dirty repo refused without a fetch"
+
+echo "== gitstate =="
+STATE="$(dirname "$BIN")/gitstate"
+"$STATE" --json >"$T/state.json"
+python3 - "$T/state.json" "$HOME/projects/c" <<'PY' && ok "--json matches the tree and v1 porcelain" || no "--json matches the tree and v1 porcelain"
+import json, subprocess, sys
+doc = json.load(open(sys.argv[1]))
+rows = {r["name"]: r for r in doc["repos"]}
+assert sorted(rows) == ["a", "c", "d", "e", "grp/b", "nope"], sorted(rows)
+assert rows["c"]["dirty"] and rows["c"]["unstaged"] == 1 and not rows["a"]["dirty"]
+assert rows["d"]["nogit"] and doc["summary"]["dirty"] == 1
+v1 = subprocess.run(["git", "status", "--porcelain"], cwd=sys.argv[2],
+                    capture_output=True, text=True).stdout.splitlines()
+assert rows["c"]["changes"] == v1, (rows["c"]["changes"], v1)
+PY
+echo x >> "$HOME/projects/e/f"
+(cd "$HOME/projects/e" && git stash -q && git commit -q --allow-empty -m local)
+line="$("$STATE" --tsv "$HOME/projects/e")"
+[ "${line}" = "$HOME/projects/e	main	origin/main	1	0	0	0	0	0	1" ] \
+  && ok "--tsv reports ahead and stash" || no "--tsv reports ahead and stash (${line})"
+"$STATE" --dirty --no-color | grep -q "^  e .*↑1 .*1 stash" && ok "--dirty lists the ahead repo" || no "--dirty lists the ahead repo"
+
+"$BIN" -j 0 all >/dev/null 2>&1 && no "-j 0 rejected" || ok "-j 0 rejected"
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
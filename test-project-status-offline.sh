@@ -0,0 +1,277 @@
+#!/usr/bin/env bash
+# Offline smoke test for project-status. Runs against throwaway git repos and
+# transcripts under a temp HOME, so it needs no live project. Complements
+# test-project-status.sh.
+set -uo pipefail
+
+BIN="$(cd "$(dirname "$0")" && pwd)/project-status"
+pass=0 fail=0
+ok()  { echo "  PASS: $1"; pass=$((pass+1)); }
+no()  { echo "  FAIL: $1"; fail=$((fail+1)); }
+py()  { python3 - "$BIN" "$@" >"$T/py.out" 2>&1; }   # heredoc snippet, module as `ps`
+
+[ -x "$BIN" ] || { echo "missing $BIN"; exit 1; }
+
+T="$(mktemp -d)"
+trap 'rm -rf "$T"' EXIT
+export HOME="$T/home" XDG_CACHE_HOME="$T/cache"
+export GIT_AUTHOR_NAME=t GIT_AUTHOR_EMAIL=t@t GIT_COMMITTER_NAME=t GIT_COMMITTER_EMAIL=t@t
+mkdir -p "$HOME"
+R="$T/repo"
+git init -q "$R" && echo x >"$R/a.py" && git -C "$R" add . && git -C "$R" commit -qm init
+
+echo "== fingerprints =="
+py "$R" <<'PY' && ok "edit inside an untracked dir changes the todos fingerprint" \
+  || { no "edit inside an untracked dir changes the todos fingerprint"; cat "$T/py.out"; }
+import os, sys, time
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", sys.argv[1]).load_module()
+root = sys.argv[2]
+os.mkdir(os.path.join(root, "newdir"))
+with open(os.path.join(root, "newdir", "a.py"), "w") as fh:
+    fh.write("x = 1\n")
+before = ps.source_fingerprints(root, root, "2w", 5)["todos"]
+time.sleep(0.01)
+with open(os.path.join(root, "newdir", "a.py"), "a") as fh:
+    fh.write("# TODO: later\n")
+after = ps.source_fingerprints(root, root, "2w", 5)["todos"]
+assert before != after, "fingerprint unchanged"
+assert any("later" in t for t in ps.code_todos(root)["items"])
+PY
+
+echo "== transcript scan cache =="
+py "$T/tx" <<'PY' && ok "resume, rescan and long-line compaction match full scans" \
+  || { no "resume, rescan and long-line compaction match full scans"; cat "$T/py.out"; }
+import json, os, sys
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", sys.argv[1]).load_module()
+os.makedirs(sys.argv[2])
+path = os.path.join(sys.argv[2], "0f0f0f0f-0000-4000-8000-000000000000.jsonl")
+
+def user(text, ts):
+    return {"type": "user", "timestamp": ts, "message": {"content": text}}
+
+def assistant(text, ts, *tools):
+    content = [{"type": "text", "text": text}] + [
+        {"type": "tool_use", "name": n, "input": i} for n, i in tools]
+    return {"type": "assistant", "timestamp": ts, "gitBranch": "main", "message": {"content": content}}
+
+def write(records, mode="a"):
+    with open(path, mode) as fh:
+        fh.writelines(json.dumps(r) + "\n" for r in records)
+
+def cached_offset():
+    with open(ps._scan_cache_path(path)) as fh:
+        return json.load(fh)["offset"]
+
+full = lambda: ps.scan_session(path, use_cache=False)
+
+# resume after an append equals a full scan, and only reads the new bytes
+write([user("add the export button", "2026-10-01T09:00:00Z"),
+       assistant("done", "2026-10-01T09:05:00Z", ("Edit", {"file_path": "/r/a.py"}))], "w")
+assert ps.scan_session(path) == full()
+assert cached_offset() == os.path.getsize(path)
+write([user("now the import one", "2026-10-02T09:00:00Z"),
+       assistant("ok", "2026-10-02T09:05:00Z", ("Write", {"file_path": "/r/b.py"}),
+                 ("Bash", {"command": "git commit -m 'add import'"}))])
+assert ps.scan_session(path) == full(), "resumed scan differs after append"
+assert cached_offset() == os.path.getsize(path)
+with open(path, "r+b") as fh:  # same size and inode, edited behind the offset
+    fh.write(fh.read().replace(b"add the export", b"ADD THE EXPORT"))
+write([user("and tests", "2026-10-03T09:00:00Z")])
+assert ps.scan_session(path)["first_user"] == "add the export button", "re-read old bytes"
+
+# a replaced file (new inode) or a truncated one is rescanned from the start
+write([user("fresh", "2026-10-04T09:00:00Z")] * 40, "w")  # longer than the offset
+os.rename(path, path + ".tmp")
+with open(path + ".tmp", "rb") as src, open(path, "wb") as dst:
+    dst.write(src.read())
+os.remove(path + ".tmp")
+assert ps.scan_session(path) == full() and full()["turns"] == 40, "inode change"
+write([user("short", "2026-10-05T09:00:00Z")], "w")
+assert ps.scan_session(path) == full() and full()["turns"] == 1, "truncation"
+
+# a line longer than LINE_CAP is compacted: strings cut, structure kept
+blob = "x\\\"y" * (ps.LINE_CAP // 2)
+big = {"type": "user", "timestamp": "2026-10-06T09:00:00Z", "message": {"content": [
+    {"type": "tool_result", "content": blob}, {"type": "text", "text": "after the dump"}]}}
+write([big, assistant("read it", "2026-10-06T09:01:00Z")])
+line = (json.dumps(big) + "\n").encode()
+assert len(line) > ps.LINE_CAP
+with open(path, "rb") as fh:
+    records = list(ps._iter_records(fh))
+nbytes, payload, complete = records[1]
+assert complete and nbytes == len(line) and len(payload) < ps.LINE_CAP
+obj = json.loads(payload)
+cut = obj["message"]["content"][0]["content"]
+assert blob.startswith(cut) and len(cut.encode()) <= ps.STRING_CAP
+assert obj["message"]["content"][1]["text"] == "after the dump"
+s = ps.scan_session(path)
+assert s == full() and s["last_user"] == "after the dump" and s["last_assistant"] == "read it"
+PY
+
+echo "== git history cache =="
+G="$T/hist"
+git init -q "$G" && mkdir "$G/src" && printf 'a\nb\n' >"$G/src/old.py" && printf '\0\1' >"$G/logo.bin"
+git -C "$G" add . && git -C "$G" commit -qm "first"
+py "$G" <<'PY' && ok "(HEAD, since) cache reused, invalidated by commits and amends" \
+  || { no "(HEAD, since) cache reused, invalidated by commits and amends"; cat "$T/py.out"; }
+import os, subprocess, sys
+from datetime import timedelta
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", sys.argv[1]).load_module()
+root = sys.argv[2]
+git = lambda *a: subprocess.run(["git", "-C", root, *a], check=True, capture_output=True)
+logs = []
+real_run = ps.run
+def counting_run(cmd, *a, **kw):
+    if cmd[:2] == ["git", "log"]:
+        logs.append(cmd)
+    return real_run(cmd, *a, **kw)
+ps.run = counting_run
+
+def history(since="2w"):
+    before = len(logs)
+    h = ps.git_history(root, since)
+    return h, len(logs) - before
+
+h, n = history()
+assert n == 1 and [c["subject"] for c in h] == ["first"], (n, h)
+assert sorted(h[0]["files"]) == [["logo.bin", 0, 0], ["src/old.py", 2, 0]], h[0]["files"]
+again, n = history()
+assert n == 0 and again == h, "unchanged HEAD re-ran git log"
+_, n = history("3d")
+assert n == 1, "other window served from cache"
+
+# a new commit moves HEAD: re-read, newest first, renames collapsed to the new path
+git("mv", "src/old.py", "src/new.py")
+with open(os.path.join(root, "src", "new.py"), "a") as fh:
+    fh.write("c\n")
+git("commit", "-qam", "second")
+h, n = history()
+assert n == 1 and [c["subject"] for c in h] == ["second", "first"], (n, h)
+assert h[0]["files"] == [["src/new.py", 1, 0]], h[0]["files"]
+
+# an uncommitted edit leaves HEAD alone; amending it does not
+with open(os.path.join(root, "src", "new.py"), "a") as fh:
+    fh.write("d\n")
+_, n = history()
+assert n == 0, "worktree edit invalidated the history"
+git("commit", "-qa", "--amend", "-m", "second, amended")
+h, n = history()
+assert n == 1 and h[0]["subject"] == "second, amended" and h[0]["files"] == [["src/new.py", 2, 0]], h
+
+# as the window slides past the commits, a hit is re-filtered without git log
+real_now = ps.now_utc
+ps.now_utc = lambda: real_now() + timedelta(weeks=3)
+h, n = history()
+assert n == 0 and h == [], (n, h)
+PY
+
+echo "== todo index =="
+D="$T/todos"
+git init -q "$D" && mkdir "$D/lib"
+printf 'x = 1  # TODO: old one\n' >"$D/a.py"
+printf 'def f():\n    pass  # FIXME: old two\n' >"$D/lib/b.py"
+printf 'no markers\n' >"$D/c.py"
+git -C "$D" add . && git -C "$D" commit -qm init
+py "$D" <<'PY' && ok "blob-keyed index rescans changed files only, new TODOs first" \
+  || { no "blob-keyed index rescans changed files only, new TODOs first"; cat "$T/py.out"; }
+import os, subprocess, sys
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", sys.argv[1]).load_module()
+root = sys.argv[2]
+git = lambda *a: subprocess.run(["git", "-C", root, *a], check=True, capture_output=True)
+def write(path, text, mode="w"):
+    os.makedirs(os.path.dirname(os.path.join(root, path)), exist_ok=True)
+    with open(os.path.join(root, path), mode) as fh:
+        fh.write(text)
+
+old = ["a.py:1:x = 1  # TODO: old one", "lib/b.py:2:pass  # FIXME: old two"]
+t = ps.code_todos(root)
+assert t["rescanned_files"] == 3 and t["items"] == old and t["new_count"] == 0, t
+assert t["by_dir"] == {".": 1, "lib": 1}, t["by_dir"]
+t = ps.code_todos(root)
+assert t["rescanned_files"] == 0 and t["items"] == old, t
+
+# a tracked edit, an untracked file and an untracked dir: only those are read
+write("c.py", "y = 2  # XXX: new in tracked\n", "a")
+write("d.py", "# TODO: new untracked\n")
+write("extra/e.py", "# TODO: new in untracked dir\n")
+t = ps.code_todos(root)
+new = ["c.py:2:y = 2  # XXX: new in tracked", "d.py:1:# TODO: new untracked",
+       "extra/e.py:1:# TODO: new in untracked dir"]
+assert t["rescanned_files"] == 3, t
+assert t["new"] == new and t["new_count"] == 3 and t["items"] == new + old, t
+assert t["total"] == 5, t
+
+# committing swaps worktree keys for blob ids: re-read, but nothing is new again
+git("add", "-A"); git("commit", "-qm", "todos")
+t = ps.code_todos(root)
+assert t["rescanned_files"] == 3 and t["new_count"] == 0, t
+assert t["items"] == sorted(new + old), t
+
+# moving a TODO down is not new; a deleted file drops out
+write("a.py", "import os\nx = 1  # TODO: old one\n")
+os.remove(os.path.join(root, "d.py"))
+t = ps.code_todos(root)
+assert t["rescanned_files"] == 1 and t["new_count"] == 0, t
+assert "a.py:2:x = 1  # TODO: old one" in t["items"], t
+assert not any(i.startswith("d.py:") for i in t["items"]) and t["total"] == 4, t
+PY
+
+echo "== child processes =="
+py "$T/kids" <<'PY' && ok "children die at their source's deadline and at exit" \
+  || { no "children die at their source's deadline and at exit"; cat "$T/py.out"; }
+import os, subprocess, sys, time
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", sys.argv[1]).load_module()
+tmp = sys.argv[2]
+os.makedirs(tmp)
+# a child that also leaves a grandchild behind, like gitlab-status -> glab
+SPAWN = 'sleep 60 & echo "$$ $!" >"$1.tmp"; mv "$1.tmp" "$1"; wait'
+
+def pids(path, timeout=10):
+    end = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < end, f"{path} never written"
+        time.sleep(0.02)
+    with open(path) as fh:
+        return [int(p) for p in fh.read().split()]
+
+def alive(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as fh:
+            return fh.read().rsplit(")", 1)[1].split()[0] not in "ZX"
+    except FileNotFoundError:
+        return False
+
+def gone(found, timeout=5):
+    end = time.monotonic() + timeout
+    while any(map(alive, found)) and time.monotonic() < end:
+        time.sleep(0.05)
+    return not any(map(alive, found))
+
+# a source deadline shorter than the child's own timeout
+t = time.monotonic()
+job = (ps.run, (["sh", "-c", SPAWN, "sh", f"{tmp}/a"], None, 45))
+results, timings = ps.run_sources({"gitlab": job}, {"gitlab": 1})
+assert time.monotonic() - t < 5 and "gitlab" not in results, timings
+assert gone(pids(f"{tmp}/a")), "child outlived its source's deadline"
+
+# a run that exits while a thread still waits on its child
+script = f"""
+import sys, threading, time
+from importlib.machinery import SourceFileLoader
+ps = SourceFileLoader("ps", {sys.argv[1]!r}).load_module()
+threading.Thread(target=ps.run_child, args=(["sh", "-c", {SPAWN!r}, "sh", {tmp + '/b'!r}],),
+                 kwargs={{"timeout": 45}}, daemon=True).start()
+while not __import__("os").path.exists({tmp + '/b'!r}):
+    time.sleep(0.02)
+"""
+subprocess.run([sys.executable, "-c", script], check=True, timeout=20)
+assert gone(pids(f"{tmp}/b")), "child outlived project-status"
+PY
+
+echo "== $pass passed, $fail failed =="
+exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)
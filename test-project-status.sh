@@ -2,6 +2,7 @@
 # Smoke test for the project-status CLI. Run from anywhere.
 # Asserts the engine produces a sensible briefing against ~/projects/webui-claude
 # (the project whose transcript drove the spec), then exercises --read/--json.
+# test-project-status-offline.sh is the hermetic twin.
 set -uo pipefail
 
 BIN="$HOME/projects/devscripts/project-status"
@@ -29,14 +30,20 @@ SAVED="$PROJ/docs/project-status.md"
 grep -q "project-status.md" "$PROJ/.gitignore" && ok "briefing is gitignored" || no "briefing is gitignored"
 
 echo "== --read round-trips =="
-rd="$(mktemp)"; "$BIN" --read >"$rd" 2>&1
+rd="$(mktemp)"; "$BIN" --read >"$rd" 2>/dev/null
 diff -q <(tail -n +12 "$SAVED") <(tail -n +12 "$rd") >/dev/null \
   && ok "--read matches saved file" || no "--read matches saved file"
 
 echo "== --json valid =="
-"$BIN" --json 2>/dev/null | python3 -c "import json,sys; d=json.load(sys.stdin); assert d['identity']['name']; assert 'sessions' in d['transcripts']" \
+"$BIN" --json 2>/dev/null | python3 -c "import json,sys; d=json.load(sys.stdin); assert d['identity']['name']; assert 'sessions' in d['transcripts']; assert all('seconds' in t for t in d['sources'].values())" \
   && ok "--json is valid & structured" || no "--json is valid & structured"
 
+echo "== fingerprint cache =="
+"$BIN" --json 2>/dev/null | python3 -c "import json,sys; d=json.load(sys.stdin); assert d['sources']['docs']['status'] == 'cached'" \
+  && ok "unchanged docs served from cache" || no "unchanged docs served from cache"
+"$BIN" --no-cache --json 2>/dev/null | python3 -c "import json,sys; d=json.load(sys.stdin); assert all(t['status'] != 'cached' for t in d['sources'].values())" \
+  && ok "--no-cache regenerates every source" || no "--no-cache regenerates every source"
+
 rm -f "$out" "$rd"
 echo "== $pass passed, $fail failed =="
 exit $([ "$fail" -eq 0 ] && echo 0 || echo 1)